@@ -1,14 +1,20 @@
 from __future__ import annotations
-from typing import Optional, Iterable, TypeVar
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterable, TypeVar, Mapping, Any, List, Final, Tuple, Dict, Type, Callable, Set
 from uuid import uuid4
+import threading
+import time
 import warnings
 
-import more_itertools
+import attr
 import pynamodb.models
+from pynamodb.models import BatchWrite
 import toolz
 from pynamodb.attributes import UnicodeAttribute, UnicodeSetAttribute
 from pynamodb.connection import Connection
 from pynamodb.constants import PAY_PER_REQUEST_BILLING_MODE
+from pynamodb.exceptions import TransactWriteError, UpdateError
 from pynamodb.indexes import GlobalSecondaryIndex, KeysOnlyProjection, IncludeProjection, AllProjection
 from pynamodb.transactions import TransactWrite, TransactGet
 
@@ -19,9 +25,225 @@ logger = logging.getLogger(__name__)
 first = toolz.excepts(StopIteration, toolz.first)
 
 T = TypeVar('T')
+M = TypeVar('M', bound=pynamodb.models.Model)
 
+TRANSACT_WRITE_MAX_ITEMS: Final = 100
+"""Maximum number of items in one DynamoDB transaction"""
+BATCH_WRITE_MAX_ITEMS: Final = 25
+"""Maximum number of items in one DynamoDB BatchWriteItem request"""
 
-class CanonicalBug(pynamodb.models.Model):
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LookupCache:
+    """LRU cache of items by model and hash key, with a time to live
+
+    Absent items are cached too. See `enable_cache`.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[type, str], Tuple[float, Optional[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_cls: Type[M], hash_key: str) -> Tuple[bool, Optional[M]]:
+        """Return whether the item is cached, and the item (None if it is known to be absent)"""
+        key = model_cls, hash_key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            raw_data = entry[1]
+
+        # return a fresh instance, so that callers cannot modify the cached item
+        return True, None if raw_data is None else model_cls.from_raw_data(raw_data)
+
+    def put(self, model_cls: type, hash_key: str, item: Optional[pynamodb.models.Model]):
+        key = model_cls, hash_key
+        raw_data = None if item is None else item.serialize()
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl, raw_data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model_cls: type, hash_key: str):
+        with self._lock:
+            self._entries.pop((model_cls, hash_key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+_cache: Optional[LookupCache] = None
+
+
+def enable_cache(maxsize: int = 10000, ttl: float = 300.0) -> LookupCache:
+    """Cache lookups of canonical, former canonical and universal bugs by hash key
+
+    Writes through the models (`save`, `update`, `delete`, and the batch and transactional writes in this module)
+    invalidate the written items. Writes by other processes are only seen after `ttl` seconds.
+
+    :param maxsize: maximum number of cached items
+    :param ttl: seconds after which a cached item is looked up again
+    :return: the cache, e.g. to check `cache.info()`
+    """
+    global _cache
+    _cache = LookupCache(maxsize=maxsize, ttl=ttl)
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    _cache = None
+
+
+def clear_cache():
+    """Forget all cached lookups, if the cache is enabled, e.g. after switching storage"""
+    if _cache is not None:
+        _cache.clear()
+
+
+def _invalidate(model: pynamodb.models.Model):
+    if _cache is not None:
+        _cache.invalidate(type(model), getattr(model, model._hash_keyname))
+
+
+class _CachedLookups:
+    """Mixin for models whose lookups by hash key go through the lookup cache"""
+
+    @classmethod
+    def get_cached(cls: Type[M], hash_key: str) -> Optional[M]:
+        """Like `first(cls.query(hash_key))`, but served from the lookup cache if it is enabled"""
+        if _cache is not None:
+            found, item = _cache.get(cls, hash_key)
+            if found:
+                return item
+
+        item = first(cls.query(hash_key))
+        if _cache is not None:
+            _cache.put(cls, hash_key, item)
+        return item
+
+    @classmethod
+    def batch_get_cached(cls: Type[M], hash_keys: Iterable[str]) -> Dict[str, M]:
+        """Like `cls.batch_get(hash_keys)`, but served from the lookup cache if it is enabled
+
+        :return: the items that exist, by hash key
+        """
+        hash_keys = set(hash_keys)
+        items = {}
+
+        if _cache is not None:
+            for hash_key in list(hash_keys):
+                found, item = _cache.get(cls, hash_key)
+                if found:
+                    hash_keys.discard(hash_key)
+                    if item is not None:
+                        items[hash_key] = item
+
+        fetched = {getattr(item, cls._hash_keyname): item for item in cls.batch_get(hash_keys)}
+        if _cache is not None:
+            for hash_key in hash_keys:
+                _cache.put(cls, hash_key, fetched.get(hash_key))
+
+        items.update(fetched)
+        return items
+
+    @classmethod
+    def batch_write(cls, auto_commit: bool = True) -> BatchWrite:
+        return _BatchWrite(cls, auto_commit=auto_commit)
+
+    def save(self, *args, **kwargs):
+        try:
+            return super().save(*args, **kwargs)
+        finally:
+            _invalidate(self)
+
+    def update(self, *args, **kwargs):
+        try:
+            return super().update(*args, **kwargs)
+        finally:
+            _invalidate(self)
+
+    def delete(self, *args, **kwargs):
+        try:
+            return super().delete(*args, **kwargs)
+        finally:
+            _invalidate(self)
+
+
+class _BatchWrite(BatchWrite):
+    """BatchWrite that invalidates the lookup cache for the written items"""
+
+    def commit(self):
+        written = [operation['item'] for operation in self.pending_operations]
+        try:
+            return super().commit()
+        finally:
+            for item in written:
+                _invalidate(item)
+
+
+class _TransactWrite(TransactWrite):
+    """TransactWrite that invalidates the lookup cache for the written items"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._written_models = []
+
+    def save(self, model, *args, **kwargs):
+        self._written_models.append(model)
+        return super().save(model, *args, **kwargs)
+
+    def update(self, model, *args, **kwargs):
+        self._written_models.append(model)
+        return super().update(model, *args, **kwargs)
+
+    def delete(self, model, *args, **kwargs):
+        self._written_models.append(model)
+        return super().delete(model, *args, **kwargs)
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            for model in self._written_models:
+                _invalidate(model)
+
+
+_transaction_factory: Optional[Callable[[], TransactWrite]] = None
+
+
+def set_transaction_factory(factory: Optional[Callable[[], TransactWrite]]):
+    """Create the transactions of this module with `factory`, e.g. `storage.SQLiteStorage.transact_write`
+
+    The transactions must support `save`, `update`, `delete` and `condition_check` like `TransactWrite`, and
+    commit when their context exits. Pass None to use DynamoDB transactions again.
+    """
+    global _transaction_factory
+    _transaction_factory = factory
+
+
+def _transact_write() -> TransactWrite:
+    if _transaction_factory is not None:
+        return _transaction_factory()
+    return _TransactWrite(connection=Connection(region=CanonicalBug.Meta.region))
+
+
+class CanonicalBug(_CachedLookups, pynamodb.models.Model):
     """Dynamo DB model for Canonical Bugs
 
     Disambiguated bug representation. There
@@ -42,35 +264,102 @@ class CanonicalBug(pynamodb.models.Model):
         region = "us-west-2"
 
     def merge(self, another_representation: CanonicalBug):
-        if another_representation.uuid == self.uuid:
-            return
+        CanonicalBug.merge_many(self, [another_representation])
 
-        for uuid in another_representation.other_representations:
-            for universal_bug in UniversalBug.query(uuid):
-                universal_bug.update(actions=[UniversalBug.canonical_bug.set(self.uuid)])
+    @classmethod
+    def merge_many(cls, target: CanonicalBug, sources: Iterable[CanonicalBug]) -> Set[str]:
+        """Merge all `sources` into `target` with chunked transactions
+
+        First, the universal bugs of the sources are repointed to `target`. Then each chunk of sources is
+        added to `target`, recorded as `FormerCanonicalBug` and deleted in one transaction. A source is therefore
+        either fully merged or left intact, and an interrupted merge can simply be retried.
+
+        Stale representations of the sources, i.e. universal bugs that are missing or point to another canonical bug,
+        are logged and left out: they are neither repointed nor added to `target`.
+
+        :param target: the canonical bug that survives
+        :param sources: the canonical bugs to merge into `target`
+        :return: the universal IDs of the representations of the sources that now point to `target`
+        """
+
+        sources = list(toolz.unique((source for source in sources if source.uuid != target.uuid), key=lambda b: b.uuid))
+        if not sources:
+            return set()
 
-        if another_representation.other_representations:
-            self.update(
-                actions=[CanonicalBug.other_representations.add(another_representation.other_representations)]
-            )
+        source_uuids = {source.uuid for source in sources}
+        universal_ids = set().union(*(source.other_representations or () for source in sources))
 
-        another_representation.die(self)
+        universal_bugs = [
+            universal_bug for universal_bug in UniversalBug.batch_get_cached(universal_ids).values()
+            if universal_bug.canonical_bug == target.uuid or universal_bug.canonical_bug in source_uuids
+        ]
+        stale_universal_ids = universal_ids - {universal_bug.universal_id for universal_bug in universal_bugs}
+        if stale_universal_ids:
+            logger.warning('not merging stale representations %s of %s into %s',
+                           sorted(stale_universal_ids), sorted(source_uuids), target.uuid)
+
+        for chunk in toolz.partition_all(TRANSACT_WRITE_MAX_ITEMS, universal_bugs):
+            with _transact_write() as transaction:
+                for universal_bug in chunk:
+                    transaction.update(
+                        universal_bug,
+                        actions=[UniversalBug.canonical_bug.set(target.uuid)],
+                        # guard against concurrent repointing; IN would be limited to 100 operands
+                        condition=UniversalBug.canonical_bug == universal_bug.canonical_bug,
+                    )
+
+        # one update of `target`, plus a save and a delete per source
+        for chunk in toolz.partition_all((TRANSACT_WRITE_MAX_ITEMS - 1) // 2, sources):
+            other_representations = set().union(
+                *(source.other_representations or () for source in chunk)) - stale_universal_ids
+            former_canonical_representations = {source.uuid for source in chunk}.union(
+                *(source.former_canonical_representations or () for source in chunk))
+
+            actions = [CanonicalBug.former_canonical_representations.add(former_canonical_representations)]
+            if other_representations:
+                actions.append(CanonicalBug.other_representations.add(other_representations))
+
+            with _transact_write() as transaction:
+                transaction.update(target, actions=actions, condition=CanonicalBug.uuid.exists())
+                for source in chunk:
+                    transaction.save(FormerCanonicalBug(uuid=source.uuid, replacement=target.uuid))
+                    # guard against universal bugs that were added to the source since it was read
+                    transaction.delete(source, condition=(
+                        CanonicalBug.other_representations == source.other_representations
+                        if source.other_representations else CanonicalBug.other_representations.does_not_exist()
+                    ))
+
+            target.other_representations = (target.other_representations or set()) | other_representations or None
+            target.former_canonical_representations = (
+                (target.former_canonical_representations or set()) | former_canonical_representations)
+
+        return {universal_bug.universal_id for universal_bug in universal_bugs}
 
     @classmethod
     def from_source_specific_bug(cls, source_specific_bug) -> CanonicalBug:
-        for canonical_bug in CanonicalBug.query(UniversalBug.from_source_specific_bug(source_specific_bug).canonical_bug):
+        if canonical_bug := CanonicalBug.get_cached(UniversalBug.from_source_specific_bug(source_specific_bug).canonical_bug):
             return canonical_bug
         else:
             raise ValueError(f'{source_specific_bug} has no associated canonical bug')
 
-    def die(self, replacement: Optional[CanonicalBug]):
+    def die(self, replacement: Optional[CanonicalBug]) -> Optional[CanonicalBug]:
         """
         Move to dead bugs table
 
-        :param replacement: the uuid of the canonical bug that replaces this bug
-        :return: None
+        If `replacement` has died since it was read, its own live replacement takes over instead; the update of
+        `replacement` is conditional on it existing, so that a dead bug is never brought back.
+
+        If the replacement turns out to be this bug itself, e.g. because this bug's replacement has died into this bug,
+        this bug already holds the representations and does not die.
+
+        :param replacement: the canonical bug that replaces this bug
+        :return: the canonical bug that replaced this bug, if any, or this bug if it did not die
         """
 
+        if replacement is not None and replacement.uuid == self.uuid:
+            logger.info('%s would replace itself; not killing it', self.uuid)
+            return self
+
         if replacement is not None:
             actions = [
                 CanonicalBug.former_canonical_representations.add({replacement.uuid}.union(self.former_canonical_representations or ()))
@@ -78,26 +367,115 @@ class CanonicalBug(pynamodb.models.Model):
             if self.other_representations:
                 actions.append(CanonicalBug.other_representations.add(self.other_representations))
 
-            replacement.update(actions=actions)
-
-        FormerCanonicalBug(uuid=self.uuid, replacement=replacement.uuid).save()
+            try:
+                replacement.update(actions=actions, condition=CanonicalBug.uuid.exists())
+            except UpdateError as e:
+                if e.cause_response_code != 'ConditionalCheckFailedException':
+                    raise
+                _invalidate(replacement)
+                live_replacement = resolve_canonical(replacement.uuid)
+                if live_replacement is not None and live_replacement.uuid == replacement.uuid:
+                    raise
+                logger.info('replacement %s of %s died; using %s', replacement.uuid, self.uuid,
+                            live_replacement and live_replacement.uuid)
+                return self.die(live_replacement)
+
+        FormerCanonicalBug(uuid=self.uuid, replacement=replacement.uuid if replacement is not None else None).save()
         self.delete()
+        return replacement
 
-    def garbage_collect(self):
-        for other_repr in self.other_representations:
-            universal_bug: UniversalBug = first(UniversalBug.query(other_repr))
+    def _garbage_collection_verdict(self, universal_bugs: Mapping[str, UniversalBug]) -> Tuple[bool, Optional[str]]:
+        """Whether this bug should die, and the uuid of its replacement if any
+
+        :param universal_bugs: the universal bugs of `other_representations`, by universal ID. Missing universal bugs
+            are absent.
+        """
+        for other_repr in self.other_representations or ():
+            universal_bug = universal_bugs.get(other_repr)
             if universal_bug is None:
-                self.die(None)
+                return True, None
             elif universal_bug.canonical_bug != self.uuid:
-                self.die(first(CanonicalBug.query(universal_bug.canonical_bug)))
+                return True, universal_bug.canonical_bug
+        return False, None
+
+    def garbage_collect(self):
+        universal_bugs = UniversalBug.batch_get_cached(self.other_representations or ())
+        dies, replacement_uuid = self._garbage_collection_verdict(universal_bugs)
+        if dies:
+            self.die(CanonicalBug.get_cached(replacement_uuid) if replacement_uuid else None)
 
     @classmethod
-    def garbage_collect_all(cls):
-        for bug in cls.scan():
-            bug.garbage_collect()
+    def garbage_collect_all(cls, total_segments: int = 1, page_size: int = 100) -> GarbageCollectionReport:
+        """Garbage collect all canonical bugs with a parallel scan
 
+        Each of the `total_segments` scan segments is processed by its own thread. Universal bugs and replacement
+        canonical bugs are fetched with BatchGetItem, one page of `page_size` canonical bugs at a time.
 
-class FormerCanonicalBug(pynamodb.models.Model):
+        :param total_segments: number of scan segments, and threads
+        :param page_size: number of canonical bugs to process per batch
+        :return: counts of scanned, killed and re-pointed canonical bugs, and the time spent per segment
+        """
+
+        def collect_segment(segment: int) -> GarbageCollectionReport:
+            started = time.perf_counter()
+            report = GarbageCollectionReport()
+            for page in toolz.partition_all(page_size, cls.scan(segment=segment, total_segments=total_segments)):
+                cls._garbage_collect_page(page, report)
+            report.segment_seconds[segment] = time.perf_counter() - started
+            logger.info('garbage collected segment %s: %s', segment, report)
+            return report
+
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            return GarbageCollectionReport.combine(executor.map(collect_segment, range(total_segments)))
+
+    @classmethod
+    def _garbage_collect_page(cls, bugs: Iterable[CanonicalBug], report: GarbageCollectionReport):
+        bugs = list(bugs)
+        universal_bugs = UniversalBug.batch_get_cached(set().union(*(bug.other_representations or () for bug in bugs)))
+
+        verdicts = [(bug, *bug._garbage_collection_verdict(universal_bugs)) for bug in bugs]
+        replacements = cls.batch_get_cached({replacement_uuid for _, dies, replacement_uuid in verdicts if replacement_uuid})
+
+        died = set()
+        for bug, dies, replacement_uuid in verdicts:
+            report.scanned += 1
+            if dies:
+                if replacement_uuid in died:
+                    # died earlier on this page, after `replacements` were read
+                    replacement = resolve_canonical(replacement_uuid)
+                else:
+                    replacement = replacements.get(replacement_uuid)
+                replacement = bug.die(replacement)
+                if replacement is bug:
+                    continue
+                died.add(bug.uuid)
+                if replacement is None:
+                    report.killed += 1
+                else:
+                    report.repointed += 1
+
+
+@attr.s(auto_attribs=True)
+class GarbageCollectionReport:
+    """Summary of `CanonicalBug.garbage_collect_all`"""
+
+    scanned: int = 0
+    killed: int = 0
+    repointed: int = 0
+    segment_seconds: Dict[int, float] = attr.ib(factory=dict)
+
+    @classmethod
+    def combine(cls, reports: Iterable[GarbageCollectionReport]) -> GarbageCollectionReport:
+        combined = cls()
+        for report in reports:
+            combined.scanned += report.scanned
+            combined.killed += report.killed
+            combined.repointed += report.repointed
+            combined.segment_seconds.update(report.segment_seconds)
+        return combined
+
+
+class FormerCanonicalBug(_CachedLookups, pynamodb.models.Model):
     """Where canonical bugs go when they die"""
 
     uuid = UnicodeAttribute(hash_key=True)
@@ -138,7 +516,7 @@ class CanonicalBugIndex(GlobalSecondaryIndex):
     canonical_bug = UnicodeAttribute(hash_key=True)
 
 
-class UniversalBug(pynamodb.models.Model):
+class UniversalBug(_CachedLookups, pynamodb.models.Model):
     """Dynamo DB model for Index of all bugs
 
     :attr universal_id: for an ideal bug, the universal_id is equal to the type_specific_id. Otherwise it is just some unique UUID.
@@ -168,31 +546,96 @@ class UniversalBug(pynamodb.models.Model):
         """
         Creates universal bug as proposed if it does not exist, then returns it. Does not
         overwrite.
+
+        The universal bug is created, and added to its canonical bug, in one transaction that is conditional on the
+        universal bug not existing. The existing universal bug is only read if that condition fails (or if the lookup
+        cache already knows it).
         """
-        if universal_bug := more_itertools.only(cls.query(universal_id)):
+        if _cache is not None:
+            found, universal_bug = _cache.get(cls, universal_id)
+            if found and universal_bug is not None:
+                return cls._propose_existing(universal_bug)
+
+        universal_bug = cls(
+            universal_id=universal_id,
+            canonical_bug=str(canonical_bug or uuid4()).lower(),
+            source=source,
+            source_specific_id=source_specific_id,
+        )
+
+        try:
+            with _transact_write() as transaction:
+                transaction.save(universal_bug, condition=UniversalBug.universal_id.does_not_exist())
+                # creates the canonical bug if it does not exist
+                transaction.update(
+                    CanonicalBug(uuid=universal_bug.canonical_bug),
+                    actions=[CanonicalBug.other_representations.add({universal_id})],
+                )
+        except TransactWriteError as e:
+            if not any(reason is not None and reason.code == 'ConditionalCheckFailed'
+                       for reason in e.cancellation_reasons):
+                raise
+
+            if existing_universal_bug := cls.get_cached(universal_id):
+                return cls._propose_existing(existing_universal_bug)
+            else:
+                raise
+        else:
+            return universal_bug
+
+    @staticmethod
+    def _propose_existing(universal_bug: UniversalBug) -> UniversalBug:
+        # TODO: validate source and source_specific_id
+        canonical_bug: CanonicalBug = CanonicalBug.get_cached(universal_bug.canonical_bug)
+        if universal_bug.universal_id not in (canonical_bug.other_representations or ()):
+            canonical_bug.update(actions=[CanonicalBug.other_representations.add({universal_bug.universal_id})])
+        return universal_bug
+
+    @classmethod
+    def propose_many(cls, proposals: Iterable[Mapping[str, Any]]) -> List[UniversalBug]:
+        """Batched version of `propose`
+
+        Existing universal bugs and their canonical bugs are resolved with BatchGetItem, and new universal
+        and canonical bugs are written with BatchWriteItem.
+
+        :param proposals: keyword arguments for `propose`, one mapping per universal bug
+        :return: the universal bugs, in the order of `proposals`
+        """
+        proposals = list(proposals)
+
+        universal_bugs = cls.batch_get_cached(proposal['universal_id'] for proposal in proposals)
+        canonical_bugs = CanonicalBug.batch_get_cached(ub.canonical_bug for ub in universal_bugs.values())
+
+        for universal_bug in universal_bugs.values():
             # TODO: validate source and source_specific_id
-            canonical_bug: CanonicalBug = first(CanonicalBug.query(universal_bug.canonical_bug))
-            if universal_bug.universal_id not in (canonical_bug.other_representations or ()):
+            canonical_bug = canonical_bugs.get(universal_bug.canonical_bug)
+            if canonical_bug is None:
+                logger.warning('%s has no associated canonical bug', universal_bug)
+            elif universal_bug.universal_id not in (canonical_bug.other_representations or ()):
                 canonical_bug.update(actions=[CanonicalBug.other_representations.add({universal_bug.universal_id})])
-            return universal_bug
-        else:
-            canonical_bug_uuid = str(canonical_bug or uuid4()).lower()
 
-            CanonicalBug(
-                uuid=canonical_bug_uuid,
-                other_representations=[universal_id],
-            ).save()
+        with CanonicalBug.batch_write() as canonical_batch, cls.batch_write() as universal_batch:
+            for proposal in proposals:
+                universal_id = proposal['universal_id']
+                if universal_id in universal_bugs:
+                    continue
 
-            universal_bug = cls(
-                universal_id=universal_id,
-                canonical_bug=canonical_bug_uuid,
-                source=source,
-                source_specific_id=source_specific_id,
-            )
+                canonical_bug_uuid = str(proposal.get('canonical_bug') or uuid4()).lower()
 
-            universal_bug.save()
+                canonical_batch.save(CanonicalBug(
+                    uuid=canonical_bug_uuid,
+                    other_representations=[universal_id],
+                ))
 
-            return universal_bug
+                universal_bugs[universal_id] = universal_bug = cls(
+                    universal_id=universal_id,
+                    canonical_bug=canonical_bug_uuid,
+                    source=proposal['source'],
+                    source_specific_id=proposal['source_specific_id'],
+                )
+                universal_batch.save(universal_bug)
+
+        return [universal_bugs[proposal['universal_id']] for proposal in proposals]
 
     def migrate_v1_1_6(self):
         actions = [
@@ -203,7 +646,7 @@ class UniversalBug(pynamodb.models.Model):
 
     @classmethod
     def from_source_specific_bug(cls, source_specific_bug):
-        for universal_bug in cls.query(source_specific_bug.universal_id):
+        if universal_bug := cls.get_cached(source_specific_bug.universal_id):
             return universal_bug
         raise ValueError(f'{source_specific_bug} has no associated universal bug')
 
@@ -229,6 +672,52 @@ def related_bugs(non_canonical_bug) -> Iterable[UniversalBug]:
     )
 
 
+def related_bugs_many(non_canonical_bugs: Iterable[T], max_workers: int = 8) -> Dict[T, List[UniversalBug]]:
+    """Like `related_bugs`, for many bugs at once
+
+    Universal bugs are resolved with BatchGetItem, and the canonical bug index is queried once per distinct
+    canonical bug, on a thread pool of `max_workers` threads.
+
+    :param non_canonical_bugs: universal bugs or source specific bugs
+    :param max_workers: maximum number of concurrent index queries
+    :return: the related universal bugs of each input bug
+    """
+
+    bugs = list(non_canonical_bugs)
+
+    for bug in bugs:
+        if isinstance(bug, CanonicalBug):
+            raise TypeError(f"{bug} should not be a CanonicalBug")
+
+    universal_bugs = UniversalBug.batch_get_cached(
+        bug.universal_id for bug in bugs if not isinstance(bug, UniversalBug))
+
+    def universal_bug_of(bug) -> UniversalBug:
+        if isinstance(bug, UniversalBug):
+            return bug
+        elif universal_bug := universal_bugs.get(bug.universal_id):
+            return universal_bug
+        else:
+            raise ValueError(f'{bug} has no associated universal bug')
+
+    bug_to_universal_bug = {bug: universal_bug_of(bug) for bug in bugs}
+    canonical_uuids = list({universal_bug.canonical_bug for universal_bug in bug_to_universal_bug.values()})
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        canonical_members = dict(zip(
+            canonical_uuids,
+            executor.map(lambda uuid: list(UniversalBug.canonical_bug_index.query(uuid)), canonical_uuids),
+        ))
+
+    return {
+        bug: [
+            member for member in canonical_members[universal_bug.canonical_bug]
+            if member.universal_id != universal_bug.universal_id
+        ]
+        for bug, universal_bug in bug_to_universal_bug.items()
+    }
+
+
 def deep_delete_source_specific_bug(bug):
     """Delete the source specific bug, its universal bug, and clean up canonical bug / links
 
@@ -248,3 +737,138 @@ def deep_delete_source_specific_bug(bug):
         canonical_bug.delete()
     else:
         canonical_bug.update(actions=[CanonicalBug.other_representations.delete([universal_id])])
+
+
+def deep_delete_many(bugs: Iterable, progress: Optional[Callable[[int, int], None]] = None):
+    """Like `deep_delete_source_specific_bug`, for many bugs at once
+
+    The bugs are grouped by canonical bug, and canonical bugs that would be left without representations
+    are deleted. Deletes are sent with BatchWriteItem, and `other_representations` updates with chunked
+    transactions.
+
+    Note: does not delete the bug data in the external source, e.g. Jira bugs
+    will not be deleted from the Jira server
+
+    :param bugs: source specific bugs, e.g. JiraBugs
+    :param progress: called with the number of completed and total writes after each request
+    :return: None
+    """
+
+    bugs = list(bugs)
+
+    universal_bugs = UniversalBug.batch_get_cached(bug.universal_id for bug in bugs if bug.universal_id)
+    for bug in bugs:
+        if bug.universal_id not in universal_bugs:
+            logger.warning('%s has no associated universal bug', bug)
+
+    deleted_universal_ids = toolz.groupby(lambda ub: ub.canonical_bug, universal_bugs.values())
+    canonical_bugs = CanonicalBug.batch_get_cached(deleted_universal_ids)
+
+    empty_canonical_bugs = []
+    shrinking_canonical_bugs = []
+    for uuid, canonical_bug in canonical_bugs.items():
+        deleted = {ub.universal_id for ub in deleted_universal_ids[uuid]}
+        if (canonical_bug.other_representations or set()) - deleted:
+            shrinking_canonical_bugs.append((canonical_bug, deleted))
+        else:
+            empty_canonical_bugs.append(canonical_bug)
+
+    total = len(bugs) + len(universal_bugs) + len(canonical_bugs)
+    done = 0
+
+    def report(count):
+        nonlocal done
+        done += count
+        logger.info('deep deleted %s of %s items', done, total)
+        if progress is not None:
+            progress(done, total)
+
+    def batch_delete(items):
+        for model_cls, group in toolz.groupby(type, items).items():
+            for chunk in toolz.partition_all(BATCH_WRITE_MAX_ITEMS, group):
+                with model_cls.batch_write() as batch:
+                    for item in chunk:
+                        batch.delete(item)
+                report(len(chunk))
+
+    batch_delete(bugs)
+    batch_delete(list(universal_bugs.values()))
+    batch_delete(empty_canonical_bugs)
+
+    for chunk in toolz.partition_all(TRANSACT_WRITE_MAX_ITEMS, shrinking_canonical_bugs):
+        with _transact_write() as transaction:
+            for canonical_bug, deleted in chunk:
+                transaction.update(canonical_bug, actions=[CanonicalBug.other_representations.delete(deleted)])
+        report(len(chunk))
+
+
+MAX_REPLACEMENT_HOPS: Final = 100
+
+
+def resolve_canonical_many(uuids: Iterable[str]) -> Dict[str, Optional[CanonicalBug]]:
+    """Resolve possibly stale canonical bug uuids to the live canonical bugs that replace them
+
+    `FormerCanonicalBug.replacement` pointers are followed for all uuids at once, with one BatchGetItem per table
+    per hop. Former canonical bugs that are more than one hop from their live canonical bug are then rewritten to
+    point to it directly, so that later lookups take a single hop.
+
+    :param uuids: uuids of live or former canonical bugs
+    :return: the live canonical bug of each uuid, or None if the chain ends in a bug that died without replacement
+        or the uuid is unknown
+    """
+
+    uuids = set(uuids)
+    live_bugs: Dict[str, Optional[CanonicalBug]] = {}
+    replacements: Dict[str, str] = {}
+
+    frontier = uuids
+    hops = 0
+    while frontier:
+        if hops > MAX_REPLACEMENT_HOPS:
+            raise ValueError(f'replacement chains longer than {MAX_REPLACEMENT_HOPS} hops')
+        hops += 1
+
+        found = CanonicalBug.batch_get_cached(frontier)
+        live_bugs.update(found)
+
+        dead = frontier - found.keys()
+        former_bugs = FormerCanonicalBug.batch_get_cached(dead)
+
+        frontier = set()
+        for uuid in dead:
+            former_bug = former_bugs.get(uuid)
+            if former_bug is None or former_bug.replacement is None:
+                live_bugs[uuid] = None
+            else:
+                replacements[uuid] = former_bug.replacement
+                if former_bug.replacement not in live_bugs and former_bug.replacement not in replacements:
+                    frontier.add(former_bug.replacement)
+
+    def terminal(uuid: str) -> str:
+        seen = set()
+        while uuid in replacements:
+            if uuid in seen:
+                raise ValueError(f'replacement cycle at {uuid}')
+            seen.add(uuid)
+            uuid = replacements[uuid]
+        return uuid
+
+    terminals = {uuid: terminal(uuid) for uuid in replacements}
+
+    shortcuts = [
+        FormerCanonicalBug(uuid=uuid, replacement=terminal_uuid)
+        for uuid, terminal_uuid in terminals.items()
+        if replacements[uuid] != terminal_uuid and live_bugs.get(terminal_uuid) is not None
+    ]
+    if shortcuts:
+        with FormerCanonicalBug.batch_write() as batch:
+            for shortcut in shortcuts:
+                batch.save(shortcut)
+
+    return {uuid: live_bugs[terminals.get(uuid, uuid)] for uuid in uuids}
+
+
+def resolve_canonical(uuid: str) -> Optional[CanonicalBug]:
+    """Resolve a possibly stale canonical bug uuid to the live canonical bug that replaces it; see
+    `resolve_canonical_many`"""
+    return resolve_canonical_many([uuid])[uuid]
@@ -0,0 +1,271 @@
+"""Near-duplicate detection of Jira bugs by summary and description
+
+Each bug's text is cut into character shingles, summarized as a MinHash signature, and indexed with locality-sensitive
+hashing (LSH): the signature is split into bands, and bugs that agree on all rows of any band are candidates. Only
+candidates are compared, so finding the duplicates of a bug does not require comparing it with every other bug.
+Candidates whose estimated Jaccard similarity reaches the threshold are reported with that similarity.
+
+Typical use::
+
+    index = DedupIndex.from_table(max_workers=8)
+    clusters = index.clusters()
+    merge_clusters(clusters)
+
+or, to index bugs as they are ingested::
+
+    for bug in index.watch(JiraBug.ingest(jira_server)):
+        ...
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import attr
+
+from .core import CanonicalBug, UniversalBug, resolve_canonical_many
+from .graph import UnionFind
+from .jira_tools import JiraBug
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+Signature = Tuple[int, ...]
+
+_MERSENNE_PRIME = (1 << 61) - 1
+EMPTY_ROW = _MERSENNE_PRIME
+"""Value of every row of the signature of a text without shingles; no hash value reaches it"""
+_non_word = re.compile(r'\W+')
+
+
+def bug_text(bug: JiraBug) -> str:
+    return f'{bug.summary or ""}\n{bug.description or ""}'
+
+
+def shingles(text: str, size: int = 5) -> AbstractSet[int]:
+    """Hashes of the `size`-character substrings of `text`, after lowercasing it and collapsing punctuation and
+    whitespace. Hashes are stable across processes."""
+    text = _non_word.sub(' ', text.lower()).strip()
+    if len(text) <= size:
+        return frozenset({zlib.crc32(text.encode())}) if text else frozenset()
+    return frozenset(zlib.crc32(text[i:i + size].encode()) for i in range(len(text) - size + 1))
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class MinHasher:
+    """Computes MinHash signatures of texts, with one universal hash function ``(a * x + b) mod p`` per row"""
+
+    num_perm: int = 128
+    shingle_size: int = 5
+    seed: int = 1
+    _coefficients: Tuple[Tuple[int, int], ...] = attr.ib(init=False, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        rng = random.Random(self.seed)
+        object.__setattr__(self, '_coefficients', tuple(
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME)) for _ in range(self.num_perm)))
+
+    def signature(self, text: str) -> Signature:
+        """The signature of `text`; all rows are `EMPTY_ROW` if `text` has no shingles, see `is_empty`"""
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return (EMPTY_ROW,) * self.num_perm
+        return tuple(min([(a * x + b) % _MERSENNE_PRIME for x in hashes]) for a, b in self._coefficients)
+
+
+def is_empty(signature: Signature) -> bool:
+    """Whether `signature` is that of a text without shingles, e.g. ``"???"``, which says nothing about duplicates"""
+    return signature[0] == EMPTY_ROW
+
+
+def similarity(signature: Signature, another_signature: Signature) -> float:
+    """Estimated Jaccard similarity of the shingles behind two signatures"""
+    return sum(a == b for a, b in zip(signature, another_signature)) / len(signature)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> int:
+    """The number of bands, dividing `num_perm`, whose similarity threshold ``(1 / bands) ** (1 / rows)`` is closest
+    to `threshold`"""
+    return min((bands for bands in range(1, num_perm + 1) if num_perm % bands == 0),
+               key=lambda bands: abs((1 / bands) ** (bands / num_perm) - threshold))
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class Cluster:
+    """Bugs that are probably duplicates of each other, by universal ID"""
+
+    members: AbstractSet[str]
+    pairs: Tuple[Tuple[str, str, float], ...]
+    """The similar pairs that link the members, with their estimated similarity"""
+
+    @property
+    def score(self) -> float:
+        """Mean similarity of `pairs`"""
+        return sum(score for _a, _b, score in self.pairs) / len(self.pairs)
+
+
+class DedupIndex:
+    """MinHash LSH index of bugs by universal ID
+
+    :param threshold: minimum estimated similarity of reported pairs; also determines the LSH bands
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.bands = lsh_bands(num_perm, threshold)
+        self.rows = num_perm // self.bands
+        self._signatures: Dict[str, Signature] = {}
+        self._buckets: List[Dict[Signature, Set[str]]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def _band_keys(self, signature: Signature) -> Iterator[Tuple[int, Signature]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def remove(self, key: str):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band][band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band][band_key]
+
+    def query(self, signature: Signature, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """The indexed keys similar to `signature`, with their similarity, most similar first"""
+        candidates = set().union(*(self._buckets[band].get(band_key, ()) for band, band_key in
+                                   self._band_keys(signature)))
+        candidates.discard(exclude)
+        matches = [(key, similarity(signature, self._signatures[key])) for key in candidates]
+        return sorted(((key, score) for key, score in matches if score >= self.threshold),
+                      key=lambda match: (-match[1], match[0]))
+
+    def insert(self, key: str, signature: Signature) -> List[Tuple[str, float]]:
+        """Index `signature` under `key`, replacing any previous signature of `key`
+
+        Empty signatures (see `is_empty`) are not indexed, since they would all match each other.
+
+        :return: the keys already indexed that are similar to `signature`, as in `query`
+        """
+        self.remove(key)
+        if is_empty(signature):
+            return []
+        matches = self.query(signature)
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+        return matches
+
+    def add(self, bug: JiraBug) -> List[Tuple[str, float]]:
+        """Index `bug` by its universal ID; see `insert`"""
+        matches = self.insert(bug.universal_id, self.hasher.signature(bug_text(bug)))
+        if matches:
+            logger.info('%s (%s) is similar to %s', bug.key, bug.universal_id, matches)
+        return matches
+
+    def add_many(self, bugs: Iterable[JiraBug], max_workers: Optional[int] = None, chunksize: int = 64):
+        """Index `bugs`, computing their signatures on a process pool of `max_workers` processes if given"""
+        bugs = [bug for bug in bugs if bug.universal_id]
+        texts = [bug_text(bug) for bug in bugs]
+
+        if max_workers is None:
+            signatures = map(self.hasher.signature, texts)
+        else:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            signatures = executor.map(self.hasher.signature, texts, chunksize=chunksize)
+
+        try:
+            for bug, signature in zip(bugs, signatures):
+                self.insert(bug.universal_id, signature)
+        finally:
+            if max_workers is not None:
+                executor.shutdown()
+
+    @classmethod
+    def from_table(cls, max_workers: Optional[int] = None, **kwargs) -> DedupIndex:
+        """Index all Jira bugs with one scan of the Jira bug table"""
+        index = cls(**kwargs)
+        index.add_many(JiraBug.scan(attributes_to_get=['id', 'summary', 'description', 'universal_id']),
+                       max_workers=max_workers)
+        return index
+
+    def watch(self, bugs: Iterable[JiraBug]) -> Iterator[JiraBug]:
+        """Index `bugs` as they are iterated, e.g. ``index.watch(JiraBug.ingest(jira_server))``, and yield them"""
+        for bug in bugs:
+            if bug.universal_id:
+                self.add(bug)
+            yield bug
+
+    def pairs(self) -> List[Tuple[str, str, float]]:
+        """All pairs of indexed keys that are candidates in some band and similar enough, most similar first"""
+        seen = set()
+        pairs = []
+        for buckets in self._buckets:
+            for bucket in buckets.values():
+                for a, b in combinations(sorted(bucket), 2):
+                    if (a, b) in seen:
+                        continue
+                    seen.add((a, b))
+                    score = similarity(self._signatures[a], self._signatures[b])
+                    if score >= self.threshold:
+                        pairs.append((a, b, score))
+        return sorted(pairs, key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+    def clusters(self) -> List[Cluster]:
+        """Connected components of `pairs`, largest first"""
+        sets: UnionFind[str] = UnionFind()
+        pairs = self.pairs()
+        for a, b, _score in pairs:
+            sets.union(a, b)
+
+        members: Dict[str, Set[str]] = {}
+        cluster_pairs: Dict[str, List[Tuple[str, str, float]]] = {}
+        for a, b, score in pairs:
+            root = sets.find(a)
+            members.setdefault(root, set()).update((a, b))
+            cluster_pairs.setdefault(root, []).append((a, b, score))
+
+        return sorted((Cluster(frozenset(members[root]), tuple(cluster_pairs[root])) for root in members),
+                      key=lambda cluster: (-len(cluster.members), -cluster.score, min(cluster.members)))
+
+
+def merge_clusters(clusters: Iterable[Cluster], min_score: float = 0.0,
+                   ) -> List[Tuple[CanonicalBug, List[CanonicalBug]]]:
+    """Merge the canonical bugs of the members of each cluster with `CanonicalBug.merge_many`
+
+    The canonical bug with the most representations survives. Clusters whose members already share a canonical bug
+    are left alone.
+
+    :param min_score: only merge clusters whose `Cluster.score` is at least this
+    :return: the targets and sources of the merges
+    """
+    merges = []
+    for cluster in clusters:
+        if cluster.score < min_score:
+            continue
+
+        universal_bugs = UniversalBug.batch_get_cached(cluster.members).values()
+        live_bugs = resolve_canonical_many({universal_bug.canonical_bug for universal_bug in universal_bugs})
+        canonical_bugs = list({bug.uuid: bug for bug in live_bugs.values() if bug is not None}.values())
+        if len(canonical_bugs) < 2:
+            continue
+
+        target = max(canonical_bugs, key=lambda bug: (len(bug.other_representations or ()), bug.uuid))
+        sources = [bug for bug in canonical_bugs if bug.uuid != target.uuid]
+        logger.info('merging %s into %s (similarity %.2f)', [bug.uuid for bug in sources], target.uuid, cluster.score)
+        CanonicalBug.merge_many(target, sources)
+        merges.append((target, sources))
+    return merges
@@ -1,4 +1,12 @@
+from functools import lru_cache
 from os import uname, environ
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import json
+import os
+import threading
+import time
+
 import boto3
 from zsec_aws_tools.iam import session_with_aliasing_workaround
 
@@ -11,16 +19,26 @@ def set_aws_profile():
         environ['AWS_PROFILE'] = resolved_profile_name
 
 
+_sessions: Dict[Tuple[Optional[str], Optional[str]], boto3.Session] = {}
+_sessions_lock = threading.Lock()
+
+
 def get_session() -> boto3.Session:
+    """Return the boto3 session for the current profile; one session is created per profile per process"""
     if not_amzn_env and not environ.get('AWS_PROFILE'):
         profile_name = 'bug-management'
     else:
         profile_name = environ.get('AWS_PROFILE')
 
-    resolved_profile_name, region_name = resolve_profile_alias(profile_name=profile_name)
-    return boto3.Session(profile_name=resolved_profile_name, region_name=region_name)
+    key = resolve_profile_alias(profile_name=profile_name)
+    with _sessions_lock:
+        if (session := _sessions.get(key)) is None:
+            resolved_profile_name, region_name = key
+            session = _sessions[key] = boto3.Session(profile_name=resolved_profile_name, region_name=region_name)
+        return session
 
 
+@lru_cache(maxsize=None)
 def resolve_profile_alias(profile_name=None, region_name=None):
     """Wrapper around boto3.Session that behaves better with `~/.aws/config`
 
@@ -35,6 +53,9 @@ def resolve_profile_alias(profile_name=None, region_name=None):
     Note that this function is necessary because `boto3.Session` will
     ignore aliases for some complicated configurations of `source_profile`.
 
+    Results are cached for the life of the process; call `resolve_profile_alias.cache_clear()`
+    after changing `~/.aws/config`.
+
     """
 
     import configparser
@@ -67,3 +88,71 @@ def resolve_profile_alias(profile_name=None, region_name=None):
             break
 
     return profile_name, region_name
+
+
+credentials_path = Path('~/.cache/bugdex/credentials.json').expanduser()
+_credentials: Dict[str, Tuple[float, Tuple[str, str]]] = {}
+_credentials_lock = threading.Lock()
+
+
+def _read_credentials_file() -> Dict[str, dict]:
+    try:
+        return json.loads(credentials_path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_credentials_file(entries: Dict[str, dict]):
+    credentials_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = credentials_path.with_suffix('.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        os.fchmod(f.fileno(), 0o600)
+        json.dump(entries, f)
+    tmp_path.replace(credentials_path)
+
+
+def get_credentials(username_parameter: str, password_parameter: str, ttl: float = 60 * 60,
+                    region_name: str = 'us-east-1', refresh: bool = False) -> Tuple[str, str]:
+    """Return a username and password stored as SecureString SSM parameters
+
+    Both are fetched with one `get_parameters` call and then kept in memory and in `credentials_path`
+    (readable only by the owner) for `ttl` seconds.
+
+    :param refresh: skip the caches, e.g. after the stored password was rotated
+    """
+
+    key = f'{region_name}:{username_parameter}:{password_parameter}'
+    now = time.time()
+
+    with _credentials_lock:
+        if not refresh:
+            if (entry := _credentials.get(key)) and entry[0] > now:
+                return entry[1]
+
+            if (entry := _read_credentials_file().get(key)) and entry['expires_at'] > now:
+                credentials = entry['username'], entry['password']
+                _credentials[key] = entry['expires_at'], credentials
+                return credentials
+
+        ssm = get_session().client('ssm', region_name=region_name)
+        response = ssm.get_parameters(Names=[username_parameter, password_parameter], WithDecryption=True)
+        if response['InvalidParameters']:
+            raise KeyError(f'SSM parameters not found: {", ".join(response["InvalidParameters"])}')
+        values = {parameter['Name']: parameter['Value'] for parameter in response['Parameters']}
+        credentials = values[username_parameter], values[password_parameter]
+
+        expires_at = now + ttl
+        _credentials[key] = expires_at, credentials
+        entries = {k: v for k, v in _read_credentials_file().items() if v['expires_at'] > now}
+        entries[key] = {'expires_at': expires_at, 'username': credentials[0], 'password': credentials[1]}
+        _write_credentials_file(entries)
+
+        return credentials
+
+
+def clear_credentials():
+    """Forget cached credentials, in memory and on disk"""
+    with _credentials_lock:
+        _credentials.clear()
+        credentials_path.unlink(missing_ok=True)
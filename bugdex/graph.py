@@ -0,0 +1,190 @@
+"""In-memory index of which bugs are the same bug
+
+The canonical bug graph is stored in DynamoDB as pointers: `UniversalBug.canonical_bug`,
+`CanonicalBug.other_representations` and `FormerCanonicalBug.replacement`. `BugGraph` loads
+all of them once and answers cluster queries without further round trips.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Generic, Hashable, Iterable, Optional, Set, TypeVar, AbstractSet, Tuple
+
+from .core import CanonicalBug, FormerCanonicalBug, UniversalBug
+
+T = TypeVar('T', bound=Hashable)
+
+
+class UnionFind(Generic[T]):
+    """Disjoint sets with union by size and path compression"""
+
+    def __init__(self):
+        self._parent: Dict[T, T] = {}
+        self._size: Dict[T, int] = {}
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._parent
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def add(self, item: T) -> T:
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+        return item
+
+    def find(self, item: T) -> T:
+        """Return the representative of the set containing `item`, adding `item` if it is new"""
+        self.add(item)
+
+        root = item
+        while self._parent[root] != root:
+            root = self._parent[root]
+
+        while self._parent[item] != root:
+            self._parent[item], item = root, self._parent[item]
+
+        return root
+
+    def union(self, a: T, b: T) -> T:
+        """Join the sets containing `a` and `b`, and return the representative of the joined set"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size.pop(root_b)
+        return root_a
+
+    def size(self, item: T) -> int:
+        return self._size[self.find(item)]
+
+
+_Node = Tuple[str, str]
+
+
+def _universal(universal_id: str) -> _Node:
+    return 'universal', universal_id
+
+
+def _canonical(uuid: str) -> _Node:
+    return 'canonical', uuid
+
+
+class BugGraph:
+    """Clusters of universal bugs that represent the same real bug
+
+    Each cluster contains universal bugs and the canonical bugs (live or former) that they point to. Bugs are
+    identified by universal ID or canonical uuid; universal IDs take precedence if both exist.
+
+    Build one with `from_tables`, and keep it up to date with `observe_propose` and `observe_merge`.
+    """
+
+    def __init__(self):
+        self._sets: UnionFind[_Node] = UnionFind()
+        self._members: Dict[_Node, Set[str]] = {}
+        self._live: Dict[_Node, str] = {}
+
+    @classmethod
+    def from_tables(cls) -> BugGraph:
+        """Build the graph from one scan of each of the canonical, former canonical and universal bug tables"""
+
+        graph = cls()
+
+        for canonical_bug in CanonicalBug.scan():
+            graph.add_canonical_bug(canonical_bug.uuid)
+
+        for former_canonical_bug in FormerCanonicalBug.scan():
+            graph.add_former_canonical_bug(former_canonical_bug.uuid, former_canonical_bug.replacement)
+
+        for universal_bug in UniversalBug.scan():
+            graph.add_universal_bug(universal_bug.universal_id, universal_bug.canonical_bug)
+
+        return graph
+
+    def _union(self, a: _Node, b: _Node, live: Optional[str] = None) -> _Node:
+        """Join the clusters of `a` and `b`. The live canonical bug is `live`, or else that of `a`, or else that of `b`."""
+        root_a, root_b = self._sets.find(a), self._sets.find(b)
+        members_a, members_b = self._members.pop(root_a, set()), self._members.pop(root_b, set())
+        live_a, live_b = self._live.pop(root_a, None), self._live.pop(root_b, None)
+        live = live or live_a or live_b
+
+        root = self._sets.union(root_a, root_b)
+
+        if len(members_a) < len(members_b):
+            members_a, members_b = members_b, members_a
+        members_a |= members_b
+        self._members[root] = members_a
+
+        if live is not None:
+            self._live[root] = live
+
+        return root
+
+    def _node(self, bug_id: str) -> _Node:
+        if (node := _universal(bug_id)) in self._sets:
+            return node
+        elif (node := _canonical(bug_id)) in self._sets:
+            return node
+        else:
+            raise KeyError(bug_id)
+
+    def add_canonical_bug(self, uuid: str):
+        root = self._sets.find(_canonical(uuid))
+        self._members.setdefault(root, set())
+        self._live.setdefault(root, uuid)
+
+    def add_former_canonical_bug(self, uuid: str, replacement: Optional[str]):
+        if replacement is None:
+            self._sets.add(_canonical(uuid))
+        else:
+            self._union(_canonical(replacement), _canonical(uuid))
+
+    def add_universal_bug(self, universal_id: str, canonical_uuid: str):
+        root = self._union(_canonical(canonical_uuid), _universal(universal_id))
+        self._members[root].add(universal_id)
+
+    def observe_propose(self, universal_bug: UniversalBug):
+        """Record the result of `UniversalBug.propose`"""
+        self.add_canonical_bug(universal_bug.canonical_bug)
+        self.add_universal_bug(universal_bug.universal_id, universal_bug.canonical_bug)
+
+    def observe_merge(self, target: CanonicalBug, sources: Iterable[CanonicalBug],
+                      universal_ids: Optional[Iterable[str]] = None):
+        """Record the result of `CanonicalBug.merge_many`
+
+        :param universal_ids: the universal IDs that `merge_many` returned. By default, the representations of
+            `sources`, except those that this graph places in the cluster of another canonical bug, since
+            `merge_many` leaves such stale representations alone.
+        """
+        sources = list(sources)
+        if universal_ids is None:
+            merged = {self._sets.find(_canonical(bug.uuid)) for bug in (target, *sources)}
+            universal_ids = [
+                universal_id for source in sources for universal_id in source.other_representations or ()
+                if _universal(universal_id) not in self._sets or self._sets.find(_universal(universal_id)) in merged
+            ]
+
+        self.add_canonical_bug(target.uuid)
+        for source in sources:
+            self._union(_canonical(target.uuid), _canonical(source.uuid), live=target.uuid)
+        for universal_id in universal_ids:
+            self.add_universal_bug(universal_id, target.uuid)
+
+    def find_canonical(self, bug_id: str) -> Optional[str]:
+        """Return the uuid of the live canonical bug of the cluster containing `bug_id`, if there is one"""
+        return self._live.get(self._sets.find(self._node(bug_id)))
+
+    def cluster(self, bug_id: str) -> AbstractSet[str]:
+        """Return the universal IDs in the cluster containing `bug_id`"""
+        return frozenset(self._members.get(self._sets.find(self._node(bug_id)), ()))
+
+    def cluster_size(self, bug_id: str) -> int:
+        """Return the number of universal bugs in the cluster containing `bug_id`"""
+        return len(self._members.get(self._sets.find(self._node(bug_id)), ()))
+
+    def same_bug(self, bug_id: str, another_bug_id: str) -> bool:
+        return self._sets.find(self._node(bug_id)) == self._sets.find(self._node(another_bug_id))
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
 import operator
-from io import BytesIO
-from itertools import chain
+import re
+import tempfile
+import threading
+import time
+from collections import deque, ChainMap
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import Dict, Any, Final, Iterable, Tuple, AbstractSet, IO, Optional, TYPE_CHECKING, Mapping, Union, ClassVar
+from typing import Dict, Any, Final, Iterable, Tuple, AbstractSet, IO, Optional, TYPE_CHECKING, Mapping, Union, ClassVar, List, Iterator, Callable, Deque, TypeVar
 from uuid import uuid4
 
 import attr
@@ -16,16 +23,89 @@ import pynamodb.models
 from jira import JIRA, Issue, Project, JIRAError, Priority
 from jira.client import ResultList
 from jira.resources import IssueType, IssueLinkType, Component
-from pandas._libs import json
-from pynamodb.attributes import UnicodeAttribute
+from .transport import JiraTransport, mount_transport
+from pynamodb.attributes import BooleanAttribute, UnicodeAttribute, UnicodeSetAttribute, UTCDateTimeAttribute
+from pynamodb.constants import PAY_PER_REQUEST_BILLING_MODE
 import pytz
 import datetime
 
 from toolz import merge
 
+logger = logging.getLogger(__name__)
+
 contains = toolz.curry(operator.contains)
 
-config = json.loads(Path('~/.config/bugdex.json').read_text())
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class BugdexConfig(Mapping[str, Any]):
+    """Settings from `~/.config/bugdex.json`, read on first access and then cached
+
+    Keys used by this module:
+
+    - ``jira_url``
+    - ``path_to_jira_username``, ``path_to_jira_password``: SSM parameter names
+    - ``issue_split_id``: ID of the "Issue split" link type
+    - ``priority_id_to_sla``: days until the due date by priority ID, e.g. ::
+
+        {
+            '1': 1,
+        }
+
+    - ``jira_timezone`` (optional)
+    - ``jira_pool_size`` (optional): connections kept open to Jira, see `transport.JiraTransport`
+    """
+
+    def __init__(self, path: Union[str, Path] = '~/.config/bugdex.json'):
+        self.path = Path(path).expanduser()
+        self._data: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = json.loads(self.path.read_text())
+        return self._data
+
+    def reload(self):
+        """Forget the cached settings; they are read again on next access"""
+        with self._lock:
+            self._data = None
+
+    def __getitem__(self, key: str) -> Any:
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+config = BugdexConfig()
+
+
+def get_config(config_overrides: Optional[Mapping[str, Any]] = None) -> Mapping[str, Any]:
+    """Return `config` with `config_overrides` taking precedence"""
+    if config_overrides:
+        return ChainMap(dict(config_overrides), config)
+    return config
+
+
+def __getattr__(name: str) -> Any:
+    # settings that used to be read at import time
+    if name in ('issue_split_id', 'priority_id_to_sla'):
+        return config[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+appsec_jql: Final = """
+(labels = AppSec)
+AND (resolution is EMPTY OR status in (Reopened))
+AND status not in (Closed, Resolved) ORDER BY summary ASC, created ASC
+""".strip()
 
 
 class JiraBug(pynamodb.models.Model):
@@ -36,6 +116,12 @@ class JiraBug(pynamodb.models.Model):
     description = UnicodeAttribute(null=True)
     issuetype = UnicodeAttribute()
     universal_id = UnicodeAttribute(null=True)
+    labels = UnicodeSetAttribute(null=True)
+    """Last known labels; None if unknown or empty"""
+    components = UnicodeSetAttribute(null=True)
+    """Last known component names; None if unknown or empty"""
+    components_known = BooleanAttribute(null=True)
+    """Whether `components` is known, which tells an issue without components from one whose components are unknown"""
 
     table_parameter_name = "/tables/bugdex/jira_bugs"
 
@@ -70,48 +156,139 @@ class JiraBug(pynamodb.models.Model):
             description=issue.fields.description,
             issuetype=issue.fields.issuetype.name,
             universal_id=universal_id,
+            **_issue_labels_and_components(issue),
         )
 
     def to_raw_issue(self, jira_server: JIRA):
         return jira_server.issue(self.key)
 
     @classmethod
-    def ingest(cls, jira_server: JIRA, issues: Iterable[Issue] = ()) -> Iterable[JiraBug]:
-        from .core import UniversalBug
+    def from_raw_issues(cls, issues: Iterable[Issue]) -> List[JiraBug]:
+        """Like `from_raw_issue`, but resolves existing universal IDs for all issues with one BatchGetItem"""
+        issues = list(issues)
+
+        existing_universal_ids = {
+            existing_bug.id: existing_bug.universal_id
+            for existing_bug in cls.batch_get({issue.id for issue in issues})
+            if existing_bug.universal_id
+        }
+
+        return [
+            cls(
+                id=issue.id,
+                key=issue.key,
+                project=issue.fields.project.key,
+                summary=issue.fields.summary,
+                description=issue.fields.description,
+                issuetype=issue.fields.issuetype.name,
+                universal_id=existing_universal_ids.get(issue.id) or str(uuid4()).lower(),
+                **_issue_labels_and_components(issue),
+            )
+            for issue in issues
+        ]
 
-        jql_str = """
-        (labels = AppSec)
-        AND (resolution is EMPTY OR status in (Reopened))
-        AND status not in (Closed, Resolved) ORDER BY summary ASC, created ASC
-        """.strip()
+    @classmethod
+    def ingest(
+            cls, jira_server: JIRA, issues: Iterable[Issue] = (), batch_size: Optional[int] = None,
+            max_workers: Optional[int] = None, stats: Optional[IngestStats] = None,
+    ) -> Iterable[JiraBug]:
+        """Save issues as JiraBugs and propose their universal bugs
+
+        :param jira_server: JIRA object
+        :param issues: issues to ingest. Defaults to the result of `appsec_jql`.
+        :param batch_size: if given, ingest issues in chunks of this size, using BatchGetItem and
+            BatchWriteItem instead of several round trips per issue.
+        :param max_workers: if given, ingest issues (or chunks of issues) on a thread pool of this size
+        :param stats: if given, updated with the number of ingested issues and the elapsed time
+        :return: the ingested bugs, in the order of `issues`
+        """
 
         if not issues:
-            issues = chain(
-                search_issues_with_scrolling(jira_server, jql_str),
-            )
+            issues = iter_issues(jira_server, appsec_jql)
+
+        if stats is None:
+            stats = IngestStats()
 
         visited = set()
 
-        for issue in issues:
-            if issue.key in visited:
-                continue
-            bug = cls.from_raw_issue(issue)
-            bug.save()
-            UniversalBug.propose(
-                universal_id=bug.universal_id,
-                source='jira',
-                source_specific_id=bug.id,
-            )
+        def unvisited(_issues):
+            # an issue updated again is ingested again, if `updated` was fetched
+            for issue in _issues:
+                version = (issue.key, getattr(issue.fields, 'updated', None))
+                if version not in visited:
+                    visited.add(version)
+                    yield issue
+
+        if batch_size is None:
+            chunks = ((issue,) for issue in unvisited(issues))
+        else:
+            chunks = toolz.partition_all(batch_size, unvisited(issues))
+
+        def ingest_chunk(chunk) -> List[JiraBug]:
+            if batch_size is None:
+                return [cls._ingest_raw_issue(issue) for issue in chunk]
+            else:
+                return cls._ingest_raw_issues(chunk)
+
+        try:
+            for bugs in _ordered_map(ingest_chunk, chunks, max_workers=max_workers):
+                for bug in bugs:
+                    stats.issues += 1
+                    yield bug
+        finally:
+            stats.finish()
+            logger.info('ingest: %s', stats)
+
+    @classmethod
+    def ingest_incremental(
+            cls, jira_server: JIRA, jql_str: str = appsec_jql, batch_size: Optional[int] = None, checkpoint_every: int = 100,
+            max_workers: Optional[int] = None, stats: Optional[IngestStats] = None, page_size: int = 100,
+    ) -> Iterable[JiraBug]:
+        """Ingest only the issues matching `jql_str` that were updated since the last sync
+
+        The last synced `updated` timestamp is stored per JQL query in `JiraSyncCheckpoint`, and is advanced every
+        `checkpoint_every` bugs, so an interrupted run resumes from its last checkpoint.
+
+        :param jira_server: JIRA object
+        :param jql_str: query string. Any ORDER BY clause is replaced by ordering on `updated`.
+        :param batch_size: see `ingest`
+        :param checkpoint_every: number of ingested bugs between checkpoint writes
+        :param max_workers: see `ingest`
+        :param stats: see `ingest`
+        :param page_size: number of issues to request per search
+        :return: the ingested bugs
+        """
+
+        checkpoint = JiraSyncCheckpoint.get_or_new(jql_str)
+        # an issue updated during the run is ingested once per `updated`
+        updated_by_key: Dict[str, Deque[datetime.datetime]] = {}
+
+        def record_updated(issues):
+            for issue in issues:
+                updated_by_key.setdefault(issue.key, deque()).append(parse_jira_datetime(issue.fields.updated))
+                yield issue
+
+        issues = iter_issues_updated_since(jira_server, jql_str, checkpoint.watermark, page_size=page_size)
+
+        since_checkpoint = 0
+        for bug in cls.ingest(
+                jira_server, record_updated(issues), batch_size=batch_size, max_workers=max_workers, stats=stats):
+            # issues are ordered by `updated`, so the watermark only moves forward
+            checkpoint.watermark = updated_by_key[bug.key].popleft()
+            since_checkpoint += 1
+            if since_checkpoint >= checkpoint_every:
+                checkpoint.save()
+                since_checkpoint = 0
             yield bug
-            visited.add(bug.key)
+
+        if since_checkpoint:
+            checkpoint.save()
 
     @classmethod
-    def ingest_one(cls, jira_server: JIRA, issue: Issue, canonical_bug=None):
+    def _ingest_raw_issue(cls, issue: Issue, canonical_bug=None) -> JiraBug:
         from .core import UniversalBug
 
-        bug = cls.from_raw_issue(
-            issue if isinstance(issue, Issue) else jira_server.issue(issue['id'])
-        )
+        bug = cls.from_raw_issue(issue)
         bug.save()
         UniversalBug.propose(
             universal_id=bug.universal_id,
@@ -121,34 +298,186 @@ class JiraBug(pynamodb.models.Model):
         )
         return bug
 
+    @classmethod
+    def _ingest_raw_issues(cls, issues: Iterable[Issue]) -> List[JiraBug]:
+        from .core import UniversalBug
+
+        bugs = cls.from_raw_issues(issues)
+
+        with cls.batch_write() as batch:
+            for bug in bugs:
+                batch.save(bug)
+
+        UniversalBug.propose_many(
+            dict(universal_id=bug.universal_id, source='jira', source_specific_id=bug.id)
+            for bug in bugs
+        )
+        return bugs
+
+    @classmethod
+    def ingest_one(cls, jira_server: JIRA, issue: Issue, canonical_bug=None):
+        return cls._ingest_raw_issue(
+            issue if isinstance(issue, Issue) else jira_server.issue(issue['id']),
+            canonical_bug=canonical_bug,
+        )
+
+
+def _issue_labels_and_components(issue: Issue) -> Dict[str, Any]:
+    """`JiraBug` labels and components of `issue`, if they were fetched"""
+    return dict(
+        labels=set(issue.fields.labels) or None if hasattr(issue.fields, 'labels') else None,
+        components={component.name for component in issue.fields.components} or None
+        if hasattr(issue.fields, 'components') else None,
+        components_known=hasattr(issue.fields, 'components'),
+    )
+
+
+@attr.s(auto_attribs=True)
+class IngestStats:
+    """Throughput summary of `JiraBug.ingest`"""
+
+    issues: int = 0
+    started: float = attr.ib(factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def issues_per_second(self) -> float:
+        return self.issues / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return f'{self.issues} issues in {self.elapsed:.1f}s ({self.issues_per_second:.1f} issues/sec)'
+
+
+def _ordered_map(func: Callable[[T], R], items: Iterable[T], max_workers: Optional[int] = None) -> Iterator[R]:
+    """Like `map`, but runs `func` on a thread pool of `max_workers` threads if given
+
+    Results are yielded in the order of `items`, and at most `2 * max_workers` items are in flight at once.
+    """
+
+    if max_workers is None:
+        yield from map(func, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight: Deque[Future] = deque()
+        for item in items:
+            in_flight.append(executor.submit(func, item))
+            if len(in_flight) >= 2 * max_workers:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class JiraSyncCheckpoint(pynamodb.models.Model):
+    """Last synced `updated` timestamp for a JQL query; see `JiraBug.ingest_incremental`"""
+
+    jql = UnicodeAttribute(hash_key=True)
+    watermark = UTCDateTimeAttribute(null=True)
+
+    table_parameter_name = "/tables/bugdex/jira_sync_checkpoints"
+
+    class Meta:
+        table_name = "bugdex_jira_sync_checkpoints_v1"
+        region = "us-west-2"
+        billing_mode = PAY_PER_REQUEST_BILLING_MODE
+
+    @classmethod
+    def get_or_new(cls, jql: str) -> JiraSyncCheckpoint:
+        for checkpoint in cls.query(jql):
+            return checkpoint
+        return cls(jql=jql)
+
+
+def parse_jira_datetime(value: str) -> datetime.datetime:
+    """Parse a Jira timestamp such as `2021-03-04T12:34:56.000-0800`"""
+    return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+
+def incremental_jql(
+        jql_str: str, watermark: Optional[datetime.datetime], config_overrides: Optional[Mapping[str, Any]] = None,
+) -> str:
+    """Restrict `jql_str` to issues updated at or after `watermark`, ordered by `updated`
+
+    JQL dates have minute resolution and are interpreted in the Jira user's time zone (`jira_timezone` in the config,
+    defaulting to `hq_tz`), so the watermark is rounded down; already-ingested issues may be fetched again.
+    """
+
+    jql_str = re.split(r'\border\s+by\b', jql_str, maxsplit=1, flags=re.IGNORECASE)[0].strip()
+
+    if watermark is not None:
+        settings = get_config(config_overrides)
+        jira_tz = pytz.timezone(settings['jira_timezone']) if 'jira_timezone' in settings else hq_tz
+        jql_str = '({}) AND updated >= "{}"'.format(jql_str, watermark.astimezone(jira_tz).strftime('%Y/%m/%d %H:%M'))
+
+    return jql_str + ' ORDER BY updated ASC, key ASC'
+
 
 # ----
 
 
-def connect_to_jira(url=config["jira_url"]) -> JIRA:
-    from .environment_tools import get_session
-    ssm = get_session().client('ssm', region_name='us-east-1')
+_jira_clients: Dict[Tuple[str, str], JIRA] = {}
+_jira_clients_lock = threading.Lock()
+
+
+def connect_to_jira(
+        url: Optional[str] = None, config_overrides: Optional[Mapping[str, Any]] = None, cached: bool = True,
+        transport: Optional[JiraTransport] = None,
+) -> JIRA:
+    """Return an authenticated Jira client; by default one client per server and user is reused for the process
+
+    :param url: defaults to ``jira_url`` in the config
+    :param config_overrides: settings to use instead of those in `config`
+    :param cached: whether to reuse the client and the credentials cached by `environment_tools.get_credentials`
+    :param transport: HTTP adapter for a new client; defaults to a `JiraTransport` with ``jira_pool_size`` connections
+    """
+    from .environment_tools import get_credentials
+    settings = get_config(config_overrides)
+    if url is None:
+        url = settings["jira_url"]
+
+    username, password = get_credentials(
+        settings["path_to_jira_username"], settings["path_to_jira_password"], refresh=not cached)
+
+    def new_client() -> JIRA:
+        client = JIRA(options={"server": url}, auth=(username, password), max_retries=0)
+        mount_transport(client, transport or JiraTransport(pool_size=settings.get("jira_pool_size", 32)))
+        return client
 
-    # ssm.describe_parameters()
-    username = ssm.get_parameter(Name=config["path_to_jira_username"], WithDecryption=True)['Parameter']['Value']
-    password = ssm.get_parameter(Name=config["path_to_jira_password"], WithDecryption=True)['Parameter']['Value']
+    if not cached:
+        return new_client()
 
-    jira_server = JIRA(options={"server": url}, auth=(username, password))
-    return jira_server
+    with _jira_clients_lock:
+        if (jira_server := _jira_clients.get((url, username))) is None:
+            jira_server = _jira_clients[url, username] = new_client()
+        return jira_server
 
 
-def get_projects(jira_server: JIRA) -> Dict[str, Project]:
+def get_projects(jira_server: JIRA, cached: bool = False) -> Dict[str, Project]:
+    """
+    :param cached: whether to use `jira_metadata`
+    """
+    if cached:
+        return jira_metadata(jira_server).projects()
     return {project.key: project for project in jira_server.projects()}
 
 
 # another interesting field: attachment
-jira_search_default_output_fields: Final = ["id", "key", "project", "summary", "description", "issuetype"]
+jira_search_default_output_fields: Final = ["id", "key", "project", "summary", "description", "issuetype", "labels", "components"]
 
 
 def search_issues_with_scrolling(jira_server, jql_str, maxResults=False, fields=None) -> ResultList:
     """Better defaults for JIRA.search_issues
 
-    Like JIRA.search_issues, but always return ResultList and default to trying to returning all issues in batches
+    Like JIRA.search_issues, but always return ResultList and default to trying to returning all issues in batches.
+    Note that the whole result is held in memory; prefer `iter_issues` for large queries.
 
     :param jira_server: JIRA object
     :param jql_str: query string
@@ -168,6 +497,101 @@ def search_issues_with_scrolling(jira_server, jql_str, maxResults=False, fields=
     )
 
 
+def iter_issues(jira_server: JIRA, jql_str: str, page_size: int = 100, fields=None, prefetch: bool = True) -> Iterator[Issue]:
+    """Stream the issues matching `jql_str`, one page at a time
+
+    At most two pages are held in memory: while page N is being consumed, page N+1 is fetched in the background.
+
+    :param jira_server: JIRA object
+    :param jql_str: query string
+    :param page_size: number of issues to request per page
+    :param fields: fields to return; defaults to `jira_search_default_output_fields`
+    :param prefetch: whether to fetch the next page while the current page is consumed
+    :return: iterator over issues
+    """
+
+    if fields is None:
+        fields = ','.join(jira_search_default_output_fields)
+
+    def fetch_page(start_at: int) -> ResultList:
+        return jira_server.search_issues(
+            jql_str=jql_str,
+            json_result=False,
+            fields=fields,
+            startAt=start_at,
+            maxResults=page_size,
+        )
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start_at = 0
+        next_page = executor.submit(fetch_page, start_at)
+
+        while True:
+            page = next_page.result()
+            start_at += len(page)
+            has_more = len(page) > 0 and start_at < page.total
+
+            if has_more and prefetch:
+                next_page = executor.submit(fetch_page, start_at)
+
+            yield from page
+
+            if not has_more:
+                break
+            elif not prefetch:
+                next_page = executor.submit(fetch_page, start_at)
+
+
+def iter_issues_updated_since(
+        jira_server: JIRA, jql_str: str, watermark: Optional[datetime.datetime], page_size: int = 100, fields=None,
+        config_overrides: Optional[Mapping[str, Any]] = None,
+) -> Iterator[Issue]:
+    """Stream the issues matching `jql_str` updated at or after `watermark`, in order of `updated`
+
+    Unlike `iter_issues`, pages are not fetched by offset: an issue updated during the run moves to the end of the
+    results, which would shift the following issues back and make an offset skip one of them. Instead, each page is
+    queried with `incremental_jql` from the `updated` of the last issue seen, and issues already yielded are skipped
+    unless they were updated again since. Such an issue is yielded again, in its new place in the order, so that a
+    watermark taken from a later issue does not pass over its update. Offsets are only used within a minute, the
+    resolution of JQL dates, when a whole page was updated in that minute.
+
+    :param fields: fields to return; must include ``updated``
+    """
+
+    if fields is None:
+        fields = ','.join(jira_search_default_output_fields + ['updated'])
+
+    def minute(timestamp: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+        return timestamp and timestamp.replace(second=0, microsecond=0)
+
+    seen: Dict[str, datetime.datetime] = {}
+    start_at = 0
+    while True:
+        page = jira_server.search_issues(
+            jql_str=incremental_jql(jql_str, watermark, config_overrides),
+            json_result=False,
+            fields=fields,
+            startAt=start_at,
+            maxResults=page_size,
+        )
+
+        for issue in page:
+            updated = parse_jira_datetime(issue.fields.updated)
+            if issue.key not in seen or updated > seen[issue.key]:
+                seen[issue.key] = updated
+                yield issue
+
+        if len(page) < page_size:
+            break
+
+        last_updated = parse_jira_datetime(page[-1].fields.updated)
+        if watermark is not None and minute(last_updated) == minute(watermark):
+            start_at += len(page)
+        else:
+            watermark = last_updated
+            start_at = 0
+
+
 progression = {
     'NeedsPriority': 'ZSecPrioritized',
     'NeedsAssignment': 'ZSecAssigned',
@@ -238,7 +662,6 @@ def deep_create_jira_bug(
 
 
 auto_split_comment: Final = 'bugdex auto-split'
-issue_split_id: Final[str] = config['issue_split_id']
 
 
 def _add_attachment(issue: Issue, attachment: IO, filename: str):
@@ -255,6 +678,7 @@ def _add_attachment(issue: Issue, attachment: IO, filename: str):
     url = self._get_url('issue/' + str(self) + '/attachments')
 
     def file_stream():
+        attachment.seek(0)  # rewind for retries
         return MultipartEncoder(
             fields={
                 'file': (filename, attachment, 'application/octet-stream')})
@@ -263,59 +687,311 @@ def _add_attachment(issue: Issue, attachment: IO, filename: str):
     r = self._session.post(
         url, data=m, headers=CaseInsensitiveDict({'content-type': m.content_type, 'X-Atlassian-Token'.lower(): 'nocheck'}), retry_data=file_stream)
 
+    return r.json()
 
-def _get_attachments(issue: Issue) -> AbstractSet[Tuple[str, bytes]]:
-    return frozenset(
-        (attachment.filename, attachment.get())
-        for attachment in issue.fields.attachment
-    )
 
+cache_dir: Final = Path('~/.cache/bugdex').expanduser()
 
-def _copy_attachments(from_issue: Issue, to_issue: Issue):
-    # copy any attachment not already attached to the new one, identifying attachments by filename and content
 
-    for _filename, _content in _get_attachments(from_issue) - _get_attachments(to_issue):
-        _add_attachment(to_issue, attachment=BytesIO(_content), filename=_filename)
+class _JsonFileStore:
+    """Small persistent key-value store kept in a JSON file, with an optional time to live per lookup"""
 
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
 
-def _get_split_issue(jira_server: JIRA, issue: Issue, new_project: Project) -> Optional[Issue]:
-    for new_issue_link in filter(lambda ll: ll.type.id == issue_split_id, issue.fields.issuelinks):
-        if new_issue := getattr(new_issue_link, 'outwardIssue', None):
-            new_issue_fields = jira_server.issue(new_issue.id).fields
-            if new_issue_fields.reporter.key == 'security.automation' and new_issue_fields.project.id == new_project.id:
-                return new_issue
+    def _load(self) -> Dict[str, Any]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text())
+            except (FileNotFoundError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _dump(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self._entries))
+        tmp_path.replace(self.path)
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[Any]:
+        """Return the value stored under `key`, unless it is missing or older than `ttl` seconds"""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or (ttl is not None and entry['stored_at'] + ttl < time.time()):
+            return None
+        return entry['value']
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._load()[key] = {'stored_at': time.time(), 'value': value}
+            self._dump()
+
+    def remove(self, key: Optional[str] = None):
+        """Remove `key`, or every key if `key` is None"""
+        with self._lock:
+            if key is None:
+                self._entries = {}
+            else:
+                self._load().pop(key, None)
+            self._dump()
 
+    def remove_prefix(self, prefix: str):
+        """Remove every key that starts with `prefix`"""
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._load().items() if not key.startswith(prefix)}
+            self._dump()
+
+
+_json_file_stores: Dict[Path, _JsonFileStore] = {}
+_json_file_stores_lock = threading.Lock()
+
+
+def _json_file_store(path: Path) -> _JsonFileStore:
+    """Return the shared `_JsonFileStore` of `path`; separate stores of one file would overwrite each other's entries"""
+    path = Path(path).expanduser().resolve()
+    with _json_file_stores_lock:
+        if (store := _json_file_stores.get(path)) is None:
+            store = _json_file_stores[path] = _JsonFileStore(path)
+        return store
+
+
+class JiraMetadataCache:
+    """Jira metadata that rarely changes, kept on disk with a time to live per entry
+
+    Covers projects (including their components and issue types), priorities and issue link types. Resources are
+    rebuilt from their cached raw JSON.
+    """
+
+    def __init__(self, jira_server: JIRA, path: Path = cache_dir / 'jira_metadata.json', ttl: float = 24 * 60 * 60):
+        """
+        :param jira_server: JIRA object used to fetch missing or expired entries
+        :param path: file to keep the cache in
+        :param ttl: default number of seconds before an entry is fetched again
+        """
+        self.jira_server = jira_server
+        self.ttl = ttl
+        self._store = _json_file_store(path)
+
+    def _key(self, *parts: str) -> str:
+        return ' '.join((self.jira_server.server_url,) + parts)
+
+    def _get_raw(self, key: str, fetch: Callable[[], Any], ttl: Optional[float]) -> Any:
+        raw = self._store.get(key, ttl=self.ttl if ttl is None else ttl)
+        if raw is None:
+            raw = fetch()
+            self._store.put(key, raw)
+        return raw
+
+    def _resource(self, resource_cls, raw):
+        return resource_cls(self.jira_server._options, self.jira_server._session, raw=raw)
+
+    def projects(self, ttl: Optional[float] = None) -> Dict[str, Project]:
+        raw_projects = self._get_raw(
+            self._key('projects'), lambda: [project.raw for project in self.jira_server.projects()], ttl)
+        return {raw['key']: self._resource(Project, raw) for raw in raw_projects}
+
+    def project(self, key: str, ttl: Optional[float] = None) -> Project:
+        return self._resource(Project, self._get_raw(self._key('project', key), lambda: self.jira_server.project(key).raw, ttl))
+
+    def priorities(self, ttl: Optional[float] = None) -> List[Priority]:
+        raw_priorities = self._get_raw(
+            self._key('priorities'), lambda: [priority.raw for priority in self.jira_server.priorities()], ttl)
+        return [self._resource(Priority, raw) for raw in raw_priorities]
+
+    def issue_link_type(self, id: str, ttl: Optional[float] = None) -> IssueLinkType:
+        return self._resource(
+            IssueLinkType, self._get_raw(self._key('issue_link_type', id), lambda: self.jira_server.issue_link_type(id).raw, ttl))
+
+    def refresh(self):
+        """Drop all cached entries of this server, so that they are fetched again on next use"""
+        self._store.remove_prefix(self._key(''))
+
+
+_jira_metadata: Dict[str, JiraMetadataCache] = {}
+
+
+def jira_metadata(jira_server: JIRA) -> JiraMetadataCache:
+    """Return the shared `JiraMetadataCache` for the server of `jira_server`"""
+    if (metadata := _jira_metadata.get(jira_server.server_url)) is None:
+        metadata = _jira_metadata[jira_server.server_url] = JiraMetadataCache(jira_server)
+    return metadata
+
+
+_attachment_hashes = _json_file_store(cache_dir / 'attachment_hashes.json')
+"""SHA-256 of attachment contents by attachment ID. Attachments are immutable, but `created` and `size` are checked."""
+
+
+def _get_attachment_sha256(attachment_id: str, created: str, size: int) -> Optional[str]:
+    if (entry := _attachment_hashes.get(attachment_id)) and entry['created'] == created and entry['size'] == size:
+        return entry['sha256']
     return None
 
 
-priority_id_to_sla = config['priority_id_to_sla']
-"""
-e.g. ::
+def _put_attachment_sha256(attachment_id: str, created: str, size: int, sha256: str):
+    _attachment_hashes.put(attachment_id, {'created': created, 'size': size, 'sha256': sha256})
+
 
-    {
-        '1': 1,
+def _get_attachments(issue: Issue) -> Dict[Tuple[str, int], AbstractSet[Optional[str]]]:
+    """Identify attachments by metadata that Jira returns with the issue
+
+    :return: the content hashes of the attachments with each (filename, size), or None for unknown hashes
+    """
+    attachments = {}
+    for attachment in issue.fields.attachment:
+        attachments.setdefault((attachment.filename, attachment.size), set()).add(
+            _get_attachment_sha256(attachment.id, attachment.created, attachment.size))
+    return attachments
+
+
+class _SpooledUpload:
+    """Read-only view of a spooled file for MultipartEncoder
+
+    MultipartEncoder needs the size of the upload. Without `len`, it would call `fileno`, which rolls a
+    SpooledTemporaryFile over to disk.
+    """
+
+    def __init__(self, spool: IO[bytes], size: int):
+        self._spool = spool
+        self._size = size
+
+    @property
+    def len(self) -> int:
+        return self._size - self._spool.tell()
+
+    def read(self, length: int = -1) -> bytes:
+        return self._spool.read(length)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._spool.seek(offset, whence)
+
+
+attachment_chunk_size: Final = 2 ** 20
+
+
+def _copy_attachments(from_issue: Issue, to_issue: Issue, max_memory: int = 64 * 2 ** 20, max_workers: int = 1):
+    """Copy any attachment not already attached to `to_issue`
+
+    Attachments are identified by filename and size, and by content hash when it is known for both. Only attachments
+    that are copied are downloaded. Each copied attachment is streamed through a temporary file that is kept in
+    memory up to its share of `max_memory`, and spills to disk beyond that.
+
+    :param max_memory: the most memory, in bytes, that attachment contents take up at once
+    :param max_workers: the number of attachments to copy in parallel
+    """
+
+    existing_attachments = _get_attachments(to_issue)
+
+    def is_missing(attachment) -> bool:
+        sha256 = _get_attachment_sha256(attachment.id, attachment.created, attachment.size)
+        existing_hashes = existing_attachments.get((attachment.filename, attachment.size), set())
+        return not existing_hashes or (sha256 is not None and None not in existing_hashes and sha256 not in existing_hashes)
+
+    def copy_attachment(attachment):
+        with tempfile.SpooledTemporaryFile(max_size=max_memory // max_workers) as spool:
+            content_hash = hashlib.sha256()
+            size = 0
+            for chunk in attachment.iter_content(chunk_size=attachment_chunk_size):
+                content_hash.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+
+            sha256 = content_hash.hexdigest()
+            _put_attachment_sha256(attachment.id, attachment.created, attachment.size, sha256)
+
+            spool.seek(0)
+            for new_attachment in _add_attachment(to_issue, attachment=_SpooledUpload(spool, size), filename=attachment.filename):
+                _put_attachment_sha256(new_attachment['id'], new_attachment['created'], new_attachment['size'], sha256)
+
+    missing_attachments = [attachment for attachment in from_issue.fields.attachment if is_missing(attachment)]
+    for _ in _ordered_map(copy_attachment, missing_attachments, max_workers=max_workers if max_workers > 1 else None):
+        pass
+
+
+split_issue_fields: Final = ["reporter", "project", "labels", "duedate", "attachment"]
+"""Fields of a split issue that `split_issue` reads"""
+
+
+def fetch_split_issue_candidates(
+        jira_server: JIRA, issues: Iterable[Issue], config_overrides: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Issue]:
+    """Fetch the outward "Issue split" links of all `issues` with one `id in (...)` search per 100 links
+
+    Only `split_issue_fields` are requested. The result can be shared by all `split_issue` calls for `issues`.
+    Linked issues that were deleted or that the user cannot see are missing from the result, i.e. are no candidates,
+    instead of failing the search.
+
+    :return: linked issues by ID
+    """
+
+    issue_split_id = get_config(config_overrides)['issue_split_id']
+    linked_ids = {
+        link.outwardIssue.id
+        for issue in issues
+        for link in issue.fields.issuelinks
+        if link.type.id == issue_split_id and hasattr(link, 'outwardIssue')
     }
-"""
+
+    linked_issues = {}
+    for chunk in toolz.partition_all(100, sorted(linked_ids)):
+        for linked_issue in jira_server.search_issues(
+                'id in ({})'.format(', '.join(chunk)), fields=','.join(split_issue_fields), maxResults=False,
+                validate_query=False):
+            linked_issues[linked_issue.id] = linked_issue
+    return linked_issues
+
+
+def _get_split_issue(
+        jira_server: JIRA, issue: Issue, new_project: Project, linked_issues: Optional[Mapping[str, Issue]] = None,
+        config_overrides: Optional[Mapping[str, Any]] = None,
+) -> Optional[Issue]:
+    """
+    :param linked_issues: result of `fetch_split_issue_candidates` for a batch of issues including `issue`
+    :return: the split issue, with `split_issue_fields`
+    """
+    if linked_issues is None:
+        linked_issues = fetch_split_issue_candidates(jira_server, [issue], config_overrides)
+
+    issue_split_id = get_config(config_overrides)['issue_split_id']
+    for new_issue_link in filter(lambda ll: ll.type.id == issue_split_id, issue.fields.issuelinks):
+        if new_issue := getattr(new_issue_link, 'outwardIssue', None):
+            if new_issue := linked_issues.get(new_issue.id):
+                if new_issue.fields.reporter.key == 'security.automation' and new_issue.fields.project.id == new_project.id:
+                    return new_issue
+
+    return None
+
 
 hq_tz = pytz.timezone('America/Los_Angeles')
 
 
-def get_due_date(priority_id) -> Optional[datetime.date]:
-    days = priority_id_to_sla[priority_id]
+def get_due_date(priority_id, config_overrides: Optional[Mapping[str, Any]] = None) -> Optional[datetime.date]:
+    days = get_config(config_overrides)['priority_id_to_sla'][priority_id]
     if days is not None:
         return datetime.datetime.now(tz=hq_tz).date() + datetime.timedelta(days=days)
     else:
         return None
 
 
-def split_issue(jira_server: JIRA, issue: Issue, new_project: Project, issue_type: IssueType, priority: Priority):
+def split_issue(
+        jira_server: JIRA, issue: Issue, new_project: Project, issue_type: IssueType, priority: Priority,
+        attachment_memory: int = 64 * 2 ** 20, attachment_workers: int = 1, issue_split: Optional[IssueLinkType] = None,
+        linked_issues: Optional[Mapping[str, Issue]] = None, config_overrides: Optional[Mapping[str, Any]] = None,
+):
     """Split the issue to a new project and issue type; idempotent
 
     TODO: set the due date based on priority, copy some of the labels
 
+    :param attachment_memory: the most memory, in bytes, used for attachment contents while copying attachments
+    :param attachment_workers: the number of attachments to copy in parallel
+    :param issue_split: the "Issue split" link type, if already fetched
+    :param linked_issues: result of `fetch_split_issue_candidates`, if already fetched for a batch of issues
+    :param config_overrides: settings to use instead of those in `config`
     """
 
-    issue_split: IssueLinkType = jira_server.issue_link_type(issue_split_id)
+    if issue_split is None:
+        issue_split = jira_metadata(jira_server).issue_link_type(get_config(config_overrides)['issue_split_id'])
 
     valid_component_names = frozenset(component.name for component in new_project.components)
 
@@ -333,12 +1009,12 @@ def split_issue(jira_server: JIRA, issue: Issue, new_project: Project, issue_typ
     )
 
     fields_duedate = dict(
-        duedate=get_due_date(issue.fields.priority.id).strftime('%Y-%m-%d'),
+        duedate=get_due_date(issue.fields.priority.id, config_overrides).strftime('%Y-%m-%d'),
     )
 
     _split_issue: Issue
-    if _split_issue := _get_split_issue(jira_server, issue, new_project):
-        new_issue_labels = set(jira_server.issue(_split_issue.id).fields.labels)
+    if _split_issue := _get_split_issue(jira_server, issue, new_project, linked_issues, config_overrides):
+        new_issue_labels = set(_split_issue.fields.labels)
         fields.update(labels=list(set(fields['labels']) | new_issue_labels))
         _split_issue.update(fields=fields)
         print('updated issue:', _split_issue.permalink())
@@ -357,7 +1033,7 @@ def split_issue(jira_server: JIRA, issue: Issue, new_project: Project, issue_typ
         print('could not set duedate, should be {}'.format(fields_duedate['duedate']))
         issue.update(fields=fields_duedate)
 
-    _copy_attachments(issue, _split_issue)
+    _copy_attachments(issue, _split_issue, max_memory=attachment_memory, max_workers=attachment_workers)
     return _split_issue
 
 
@@ -376,7 +1052,7 @@ class BugdexJiraFields:
     issuetype: Mapping[str, str] = attr.ib(default=Map({'name': 'Bug'}))
 
     def to_jira_update_args(self) -> Mapping[str, Any]:
-        from .serializing import CustomEncoder
+        from .serializing import represent
 
         def raw(component):
             if isinstance(component, Component):
@@ -390,13 +1066,41 @@ class BugdexJiraFields:
 
         raw_fields = toolz.assoc(attr.asdict(self), 'components', raw_components)
 
-        return CustomEncoder().deep_represent(raw_fields)
+        return represent(raw_fields)
 
 
-def update_bug(jira_server: JIRA, bug: JiraBug, fields: BugdexJiraFields):
-    issue = bug.to_raw_issue(jira_server)
+update_bug_fields: Final = ["summary", "description", "labels", "components", "issuetype"]
+"""Fields of an issue that `update_bug` compares"""
 
-    labels = set(fields.labels) | set(issue.fields.labels)
+
+def update_bug(jira_server: JIRA, bug: JiraBug, fields: BugdexJiraFields, refresh: bool = False) -> bool:
+    """Update the issue of `bug` to `fields`, sending only the fields that differ; idempotent
+
+    Labels are always read from Jira, since others add them, and the missing ones are sent as ``add`` operations, so
+    labels added in Jira are never removed. The current summary, description, components and issue type are taken
+    from `bug`, as of its last ingest or update, if it knows the components, even if there are none (see
+    `JiraBug.components_known`). Otherwise, or if `refresh`, they are fetched along with the labels. Nothing is sent
+    if nothing differs. `bug` is saved with the new state.
+
+    :param refresh: compare against the issue in Jira even if `bug` knows its state
+    :return: whether the issue was updated
+    """
+
+    # bugs saved before `components_known` existed know their components if they have any
+    fetched = refresh or not (bug.components_known or bug.components)
+    issue = jira_server.issue(bug.key, fields=','.join(update_bug_fields if fetched else ['labels']))
+    labels_and_components = _issue_labels_and_components(issue)
+    if fetched:
+        bug.summary = issue.fields.summary
+        bug.description = issue.fields.description
+        bug.issuetype = issue.fields.issuetype.name
+        bug.components = labels_and_components['components']
+        bug.components_known = labels_and_components['components_known']
+
+    stored_labels = bug.labels
+    current_labels = set(labels_and_components['labels'] or ())
+    bug.labels = current_labels or None
+    labels = set(fields.labels) | current_labels
 
     if 'ZSecTriaged' not in labels:
         labels.add('ZSecNeedsTriage')
@@ -411,5 +1115,40 @@ def update_bug(jira_server: JIRA, bug: JiraBug, fields: BugdexJiraFields):
             labels.add('ZSecNeedsValidation')
 
     merged_fields = attr.evolve(fields, labels=labels)
+    desired = merged_fields.to_jira_update_args()
+
+    # components given only by ID cannot be compared with the known names, so they are always sent
+    desired_component_names = {component.get('name') for component in desired['components']}
 
-    issue.update(fields=merged_fields.to_jira_update_args())
+    differs = dict(
+        summary=desired['summary'] != bug.summary,
+        description=desired['description'] != bug.description,
+        components=desired_component_names != set(bug.components or ()),
+        issuetype=desired['issuetype'].get('name') != bug.issuetype,
+    )
+    changed = {key: value for key, value in desired.items() if key != 'labels' and differs.get(key, True)}
+    added_labels = labels - current_labels
+
+    if not changed and not added_labels:
+        if fetched or bug.labels != stored_labels:
+            bug.save()
+        return False
+
+    update_args = {}
+    if changed:
+        update_args['fields'] = changed
+    if added_labels:
+        update_args['update'] = {'labels': [{'add': label} for label in sorted(added_labels)]}
+    jira_server._session.put(jira_server._get_url('issue/' + bug.id), data=json.dumps(update_args))
+
+    bug.summary = merged_fields.summary
+    bug.description = merged_fields.description
+    bug.labels = labels or None
+    if None not in desired_component_names:
+        bug.components = desired_component_names or None
+        bug.components_known = True
+    if 'name' in desired['issuetype']:
+        bug.issuetype = desired['issuetype']['name']
+    bug.save()
+
+    return True
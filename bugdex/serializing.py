@@ -4,7 +4,7 @@ import datetime
 import operator
 from warnings import warn
 from numbers import Number
-from typing import Mapping, Iterable
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Iterable, Tuple, Union
 
 import toolz
 
@@ -21,6 +21,187 @@ class DateTimeEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
+_SCALAR, _MAPPING, _ITERABLE, _UNSUPPORTED = range(4)
+
+_kinds: Dict[type, int] = {}
+"""Dispatch cache: how each type is represented, so the ABC checks run once per type"""
+
+
+def _kind(cls: type) -> int:
+    try:
+        return _kinds[cls]
+    except KeyError:
+        if issubclass(cls, (str, Number)) or cls is type(None):
+            kind = _SCALAR
+        elif issubclass(cls, Mapping):
+            kind = _MAPPING
+        elif issubclass(cls, Iterable):
+            kind = _ITERABLE
+        else:
+            kind = _UNSUPPORTED
+        _kinds[cls] = kind
+        return kind
+
+
+def represent(obj):
+    """Deeply convert mappings to dicts and other iterables (e.g. sets, `immutables.Map` values) to lists
+
+    Strings, numbers and None are kept as they are. Uses an explicit stack, so depth is not limited by recursion.
+    """
+
+    kind = _kinds[type(obj)] if type(obj) in _kinds else _kind(type(obj))
+    if kind == _SCALAR:
+        return obj
+    elif kind == _UNSUPPORTED:
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    root: Union[dict, list] = {} if kind == _MAPPING else []
+    active = {id(obj)}
+    # frames: (container being filled, remaining items of the source, id of the source)
+    stack: List[Tuple[Union[dict, list], Iterator, int]] = [
+        (root, iter(obj.items()) if kind == _MAPPING else iter(obj), id(obj))]
+
+    while stack:
+        target, items, source_id = stack[-1]
+        is_dict = type(target) is dict
+        for item in items:
+            if is_dict:
+                key, value = item
+                if _kind(type(key)) != _SCALAR:
+                    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+            else:
+                value = item
+
+            value_type = type(value)
+            kind = _kinds[value_type] if value_type in _kinds else _kind(value_type)
+            if kind == _SCALAR:
+                child = value
+            elif kind == _UNSUPPORTED:
+                raise TypeError(f'Object of type {value_type.__name__} is not JSON serializable')
+            else:
+                if id(value) in active:
+                    raise ValueError('Circular reference detected')
+                child = {} if kind == _MAPPING else []
+
+            if is_dict:
+                target[key] = child
+            else:
+                target.append(child)
+
+            if kind != _SCALAR:
+                active.add(id(value))
+                stack.append((child, iter(value.items()) if kind == _MAPPING else iter(value), id(value)))
+                break
+        else:
+            stack.pop()
+            active.discard(source_id)
+
+    return root
+
+
+def _float_repr(value: float, allow_nan: bool) -> str:
+    if value != value:
+        text = 'NaN'
+    elif value == float('inf'):
+        text = 'Infinity'
+    elif value == -float('inf'):
+        text = '-Infinity'
+    else:
+        return float.__repr__(value)
+
+    if not allow_nan:
+        raise ValueError(f'Out of range float values are not JSON compliant: {value!r}')
+    return text
+
+
+def _scalar_json(value, encode_string: Callable[[str], str], allow_nan: bool) -> str:
+    if isinstance(value, str):
+        return encode_string(value)
+    elif value is None:
+        return 'null'
+    elif value is True:
+        return 'true'
+    elif value is False:
+        return 'false'
+    elif isinstance(value, int):
+        return int.__repr__(value)
+    elif isinstance(value, float):
+        return _float_repr(value, allow_nan)
+    else:
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _key_json(key, encode_string: Callable[[str], str], allow_nan: bool) -> str:
+    if isinstance(key, str):
+        return encode_string(key)
+    elif isinstance(key, float):
+        return encode_string(_float_repr(key, allow_nan))
+    else:
+        # like json: true, false, null and integers become strings
+        return encode_string(_scalar_json(key, encode_string, allow_nan))
+
+
+def dumps(obj, ensure_ascii: bool = True, allow_nan: bool = True) -> str:
+    """Like ``json.dumps(obj, cls=CustomEncoder)``, without building a deep copy of `obj` first
+
+    Mappings become objects and other iterables become arrays, in iteration order.
+    """
+
+    encode_string = json.encoder.encode_basestring_ascii if ensure_ascii else json.encoder.encode_basestring
+    chunks: List[str] = []
+    append = chunks.append
+
+    kind = _kinds[type(obj)] if type(obj) in _kinds else _kind(type(obj))
+    if kind == _SCALAR:
+        return _scalar_json(obj, encode_string, allow_nan)
+    elif kind == _UNSUPPORTED:
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    append('{' if kind == _MAPPING else '[')
+    active = {id(obj)}
+    # frames: (whether the source is a mapping, remaining items of the source, id of the source, whether it is empty)
+    stack: List[List[Any]] = [[kind == _MAPPING, iter(obj.items()) if kind == _MAPPING else iter(obj), id(obj), True]]
+
+    while stack:
+        frame = stack[-1]
+        is_mapping, items, source_id, first = frame
+        for item in items:
+            if not first:
+                append(', ')
+            first = False
+
+            if is_mapping:
+                key, value = item
+                append(encode_string(key) if type(key) is str else _key_json(key, encode_string, allow_nan))
+                append(': ')
+            else:
+                value = item
+
+            value_type = type(value)
+            if value_type is str:
+                append(encode_string(value))
+                continue
+            kind = _kinds[value_type] if value_type in _kinds else _kind(value_type)
+            if kind == _SCALAR:
+                append(_scalar_json(value, encode_string, allow_nan))
+            elif kind == _UNSUPPORTED:
+                raise TypeError(f'Object of type {value_type.__name__} is not JSON serializable')
+            else:
+                if id(value) in active:
+                    raise ValueError('Circular reference detected')
+                active.add(id(value))
+                append('{' if kind == _MAPPING else '[')
+                frame[3] = False
+                stack.append([kind == _MAPPING, iter(value.items()) if kind == _MAPPING else iter(value), id(value), True])
+                break
+        else:
+            stack.pop()
+            active.discard(source_id)
+            append('}' if is_mapping else ']')
+
+    return ''.join(chunks)
+
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Mapping):
@@ -31,16 +212,8 @@ class CustomEncoder(json.JSONEncoder):
             return super().default(obj)
 
     def deep_represent(self, obj):
-        if isinstance(obj, (str, Number)):
-            return obj
-
-        default_obj = self.default(obj)
-        if isinstance(default_obj, dict):
-            return {self.deep_represent(k): self.deep_represent(v) for k, v in default_obj.items()}
-        elif isinstance(default_obj, list):
-            return [self.deep_represent(elt) for elt in default_obj]
-        else:
-            raise NotImplementedError(f'invalid type {type(default_obj)}')
+        """Same as `represent`"""
+        return represent(obj)
 
 
 def replace_json_default_encoder(encoder, /):
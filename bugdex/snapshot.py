@@ -0,0 +1,287 @@
+"""Snapshots of the bugdex tables as compressed JSON lines
+
+`export_snapshot` scans each table with a parallel segmented scan and streams the items, as DynamoDB-typed JSON, into
+gzipped JSON lines files of at most `chunk_items` items each. Each segment writes its own files page by page, so memory
+use is bounded by one page per segment. A ``manifest.json`` listing the files and item counts is written last; a
+directory without one is an incomplete export.
+
+`import_snapshot` writes the items back with BatchWriteItem, through an `AdaptiveRateLimiter` per table that halves
+its rate when DynamoDB throttles or leaves items unprocessed, and recovers gradually.
+
+A scan is not a point-in-time copy: items written during the export may be exported in their old or new state. The
+manifest records when the export started and finished.
+
+Typical use::
+
+    from bugdex import snapshot
+
+    snapshot.export_snapshot('snapshots/2024-01-01', read_capacity_per_second=100)
+    ...
+    storage.use_sqlite('bugdex.sqlite')
+    snapshot.import_snapshot('snapshots/2024-01-01')
+"""
+
+from __future__ import annotations
+
+import datetime
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Type, Union
+
+import pynamodb.models
+import toolz
+from pynamodb.connection.base import RATE_LIMITING_ERROR_CODES
+from pynamodb.constants import ITEM, ITEMS, PUT_REQUEST, UNPROCESSED_ITEMS
+from pynamodb.exceptions import PutError
+from pynamodb.pagination import PageIterator
+
+from . import core
+from .core import BATCH_WRITE_MAX_ITEMS
+from .storage import default_models
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'bugdex-snapshot'
+VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def _now() -> str:
+    return datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+
+
+def _select_models(models: Optional[Iterable[Type[pynamodb.models.Model]]],
+                   tables: Optional[Collection[str]]) -> List[Type[pynamodb.models.Model]]:
+    models = default_models() if models is None else list(models)
+    if tables is not None:
+        unknown = set(tables) - {model_cls.Meta.table_name for model_cls in models}
+        if unknown:
+            raise ValueError(f'unknown tables: {sorted(unknown)}')
+        models = [model_cls for model_cls in models if model_cls.Meta.table_name in tables]
+    return models
+
+
+# ---- export
+
+class _ChunkWriter:
+    """Writes items to numbered gzipped JSON lines files, starting a new file every `chunk_items` items"""
+
+    def __init__(self, directory: Path, prefix: str, chunk_items: int, compresslevel: int):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_items = chunk_items
+        self.compresslevel = compresslevel
+        self.files: List[Dict[str, Any]] = []
+        self._file = None
+        self._items = 0
+
+    def _path(self) -> Path:
+        return self.directory / f'{self.prefix}-{len(self.files):05d}.jsonl.gz'
+
+    def write(self, item: Dict[str, Any]):
+        if self._file is None:
+            self._file = gzip.open(self._path().with_suffix('.tmp'), 'wt', encoding='utf-8',
+                                   compresslevel=self.compresslevel)
+        self._file.write(json.dumps(item, separators=(',', ':')))
+        self._file.write('\n')
+        self._items += 1
+        if self._items == self.chunk_items:
+            self.close()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        path = self._path()
+        os.replace(path.with_suffix('.tmp'), path)
+        self.files.append({'path': path.name, 'items': self._items})
+        self._file = None
+        self._items = 0
+
+
+def _export_segment(model_cls: Type[pynamodb.models.Model], directory: Path, segment: int, total_segments: int,
+                    chunk_items: int, page_size: Optional[int], rate_limit: Optional[float],
+                    compresslevel: int) -> List[Dict[str, Any]]:
+    scan_kwargs = dict(segment=segment, total_segments=total_segments)
+    if page_size is not None:
+        scan_kwargs['limit'] = page_size
+
+    writer = _ChunkWriter(directory, f'segment-{segment:04d}', chunk_items, compresslevel)
+    # pages of raw items: no model instances are created
+    for page in PageIterator(model_cls._get_connection().scan, (), scan_kwargs, rate_limit=rate_limit):
+        for item in page.get(ITEMS, ()):
+            writer.write(item)
+    writer.close()
+    return writer.files
+
+
+def export_snapshot(
+        directory: Union[str, Path], models: Optional[Iterable[Type[pynamodb.models.Model]]] = None,
+        tables: Optional[Collection[str]] = None, total_segments: int = 4, chunk_items: int = 100_000,
+        page_size: Optional[int] = None, read_capacity_per_second: Optional[float] = None, compresslevel: int = 6,
+) -> Dict[str, Any]:
+    """Export `models` (by default, all bugdex models) to `directory`
+
+    :param tables: if given, only export the models with these table names
+    :param total_segments: number of segments, and of threads, that each table is scanned with
+    :param chunk_items: maximum number of items per file
+    :param page_size: number of items per Scan request
+    :param read_capacity_per_second: if given, the read capacity that the scan of each table may consume per second,
+        shared between its segments
+    :return: the manifest
+    """
+    directory = Path(directory)
+    if (directory / MANIFEST).exists():
+        raise FileExistsError(f'{directory / MANIFEST} already exists')
+
+    manifest = {'format': FORMAT, 'version': VERSION, 'started': _now(), 'tables': {}}
+    segment_rate_limit = read_capacity_per_second / total_segments if read_capacity_per_second else None
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        for model_cls in _select_models(models, tables):
+            table_name = model_cls.Meta.table_name
+            table_directory = directory / table_name
+            table_directory.mkdir(parents=True, exist_ok=True)
+
+            files = [
+                {**file, 'path': f'{table_name}/{file["path"]}'}
+                for segment_files in executor.map(
+                    lambda segment: _export_segment(model_cls, table_directory, segment, total_segments, chunk_items,
+                                                    page_size, segment_rate_limit, compresslevel),
+                    range(total_segments))
+                for file in segment_files
+            ]
+            manifest['tables'][table_name] = {
+                'model': f'{model_cls.__module__}.{model_cls.__qualname__}',
+                'items': sum(file['items'] for file in files),
+                'files': files,
+            }
+            logger.info('exported %d items from %s', manifest['tables'][table_name]['items'], table_name)
+
+    manifest['finished'] = _now()
+    with open(directory / MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(directory: Union[str, Path]) -> Dict[str, Any]:
+    with open(Path(directory) / MANIFEST) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT or manifest.get('version') != VERSION:
+        raise ValueError(f'{directory} is not a version {VERSION} {FORMAT}')
+    return manifest
+
+
+# ---- import
+
+class AdaptiveRateLimiter:
+    """Limits the rate of items written by several threads, adapting it to throttling
+
+    The rate starts at, and never exceeds, `rate` items per second. `throttled` halves it, down to `min_rate`, and
+    `succeeded` raises it again by `increase` (by default, a twentieth of `rate`).
+    """
+
+    def __init__(self, rate: float, min_rate: float = 1.0, increase: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.increase = rate / 20 if increase is None else increase
+        self.rate = rate
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next_free = clock()
+
+    def acquire(self, items: int = 1):
+        """Wait until `items` more items may be written"""
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_free)
+            self._next_free = start + items / self.rate
+        if start > now:
+            self._sleep(start - now)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+        logger.info('throttled; writing at most %.1f items per second', self.rate)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+def _write_batch(connection, table_name: str, items: List[Dict[str, Any]], limiter: AdaptiveRateLimiter):
+    pending = items
+    while pending:
+        limiter.acquire(len(pending))
+        try:
+            data = connection.batch_write_item(put_items=pending)
+        except PutError as e:
+            if e.cause_response_code not in RATE_LIMITING_ERROR_CODES:
+                raise
+            limiter.throttled()
+            continue
+
+        unprocessed = (data or {}).get(UNPROCESSED_ITEMS, {}).get(table_name)
+        if unprocessed:
+            limiter.throttled()
+            pending = [request[PUT_REQUEST][ITEM] for request in unprocessed]
+        else:
+            limiter.succeeded()
+            pending = []
+
+
+def _import_file(connection, table_name: str, path: Path, expected_items: int, limiter: AdaptiveRateLimiter) -> int:
+    imported = 0
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for batch in toolz.partition_all(BATCH_WRITE_MAX_ITEMS, map(json.loads, f)):
+            _write_batch(connection, table_name, list(batch), limiter)
+            imported += len(batch)
+    if imported != expected_items:
+        raise ValueError(f'{path} has {imported} items; the manifest lists {expected_items}')
+    return imported
+
+
+def import_snapshot(
+        directory: Union[str, Path], models: Optional[Iterable[Type[pynamodb.models.Model]]] = None,
+        tables: Optional[Collection[str]] = None, items_per_second: float = 100.0, max_workers: int = 4,
+) -> Dict[str, int]:
+    """Write the items of a snapshot made by `export_snapshot` to the tables of `models`
+
+    Existing items with the same keys are overwritten; other items are left alone.
+
+    :param models: models to import, by default all bugdex models; tables of the snapshot without a model are skipped
+    :param tables: if given, only import the models with these table names
+    :param items_per_second: maximum write rate per table
+    :param max_workers: number of files of a table written concurrently
+    :return: number of imported items by table name
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+
+    imported = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for model_cls in _select_models(models, tables):
+                table_name = model_cls.Meta.table_name
+                if table_name not in manifest['tables']:
+                    continue
+
+                connection = model_cls._get_connection()
+                limiter = AdaptiveRateLimiter(items_per_second)
+                imported[table_name] = sum(executor.map(
+                    lambda file: _import_file(connection, table_name, directory / file['path'], file['items'], limiter),
+                    manifest['tables'][table_name]['files']))
+                logger.info('imported %d items into %s', imported[table_name], table_name)
+    finally:
+        # items were written without going through the models
+        core.clear_cache()
+    return imported
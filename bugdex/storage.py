@@ -0,0 +1,706 @@
+"""Local SQLite storage for the bugdex models
+
+`SQLiteStorage` stands in for DynamoDB: it implements the table operations that pynamodb models call (get, put, update,
+delete, batch get and write, query and scan, including on global secondary indexes), and the multi-item transactions of
+`bugdex.core`. Items are stored as DynamoDB-typed JSON, one SQLite table per DynamoDB table, and conditions and update
+actions are evaluated in Python. Global secondary index keys are indexed with ``json_extract`` expression indexes.
+
+Typical use, for offline batch jobs, experiments and tests::
+
+    from bugdex import storage
+
+    storage.use_sqlite('bugdex.sqlite')  # or ':memory:'
+    ...
+    storage.use_dynamodb()
+
+Limitations: numbers in keys sort as strings, and capacity, consistency and TTL options are ignored.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type, Union
+
+import pynamodb.models
+from pynamodb.constants import (
+    ATTRIBUTES, CAMEL_COUNT, ITEM, ITEM_COUNT, ITEMS, LAST_EVALUATED_KEY, RESPONSES, SCANNED_COUNT, TABLE_STATUS,
+    UNPROCESSED_ITEMS, UNPROCESSED_KEYS,
+)
+from pynamodb.exceptions import (
+    CancellationReason, DeleteError, PutError, TableDoesNotExist, TransactWriteError, UpdateError, VerboseClientError,
+)
+from pynamodb.expressions.condition import (
+    And, BeginsWith, Between, Comparison, Condition, Contains, Exists, In, IsType, Not, NotExists, Or,
+)
+from pynamodb.expressions.operand import Path as _Path, Value, _Decrement, _IfNotExists, _Increment, _ListAppend, _Size
+from pynamodb.expressions.update import Action, AddAction, DeleteAction, RemoveAction, SetAction
+from pynamodb.expressions.util import PATH_SEGMENT_REGEX
+
+Item = Dict[str, Dict[str, Any]]
+"""DynamoDB-typed item, e.g. ``{'uuid': {'S': '...'}, 'other_representations': {'SS': [...]}}``"""
+
+
+# ---- typed values
+
+def _plain(value: Dict[str, Any]) -> Any:
+    """Python value of a typed value, for comparisons"""
+    (attr_type, raw), = value.items()
+    if attr_type == 'N':
+        return Decimal(raw)
+    elif attr_type == 'NS':
+        return frozenset(map(Decimal, raw))
+    elif attr_type in ('SS', 'BS'):
+        return frozenset(raw)
+    elif attr_type == 'L':
+        return [_plain(element) for element in raw]
+    elif attr_type == 'M':
+        return {key: _plain(element) for key, element in raw.items()}
+    else:
+        return raw
+
+
+def _equal(a: Optional[dict], b: Optional[dict]) -> bool:
+    return a is not None and b is not None and next(iter(a)) == next(iter(b)) and _plain(a) == _plain(b)
+
+
+def _ordered(a: Optional[dict], b: Optional[dict]) -> bool:
+    """Whether `a` and `b` can be ordered: both are strings, numbers or binary"""
+    return a is not None and b is not None and next(iter(a)) == next(iter(b)) and next(iter(a)) in ('S', 'N', 'B')
+
+
+def _sort_key(value: Optional[dict]) -> Tuple:
+    return () if value is None else (_plain(value),)
+
+
+def _encode(value: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-compatible form of a typed value: binary values are base64-encoded"""
+    (attr_type, raw), = value.items()
+    if attr_type == 'B':
+        return {'B': base64.b64encode(raw).decode()}
+    elif attr_type == 'BS':
+        return {'BS': [base64.b64encode(element).decode() for element in raw]}
+    elif attr_type == 'L':
+        return {'L': [_encode(element) for element in raw]}
+    elif attr_type == 'M':
+        return {'M': {key: _encode(element) for key, element in raw.items()}}
+    return value
+
+
+def _decode(value: Dict[str, Any]) -> Dict[str, Any]:
+    (attr_type, raw), = value.items()
+    if attr_type == 'B':
+        return {'B': base64.b64decode(raw)}
+    elif attr_type == 'BS':
+        return {'BS': [base64.b64decode(element) for element in raw]}
+    elif attr_type == 'L':
+        return {'L': [_decode(element) for element in raw]}
+    elif attr_type == 'M':
+        return {'M': {key: _decode(element) for key, element in raw.items()}}
+    return value
+
+
+def _dumps_item(item: Item) -> str:
+    return json.dumps({name: _encode(value) for name, value in item.items()})
+
+
+def _loads_item(text: str) -> Item:
+    return {name: _decode(value) for name, value in json.loads(text).items()}
+
+
+# ---- document paths
+
+def _segments(path: _Path) -> List[Union[str, int]]:
+    """Map keys and list indexes along `path`, e.g. ``['a', 'b', 0, 'c']`` for ``a.b[0].c``"""
+    segments: List[Union[str, int]] = []
+    for segment in path.path:
+        name, indexes = PATH_SEGMENT_REGEX.match(segment).groups()
+        segments.append(name)
+        segments.extend(int(index) for index in indexes.strip('[]').split('][') if index)
+    return segments
+
+
+def _get_path(item: Item, path: _Path) -> Optional[dict]:
+    value: Any = {'M': item}
+    for segment in _segments(path):
+        (attr_type, raw), = value.items()
+        if isinstance(segment, int):
+            if attr_type != 'L' or segment >= len(raw):
+                return None
+        elif attr_type != 'M' or segment not in raw:
+            return None
+        value = raw[segment]
+    return value
+
+
+def _set_path(item: Item, path: _Path, new_value: Optional[dict]):
+    """Set the value at `path`, or remove it if `new_value` is None"""
+    *parents, last = _segments(path)
+    container: Any = item
+    for segment in parents:
+        container = container[segment]
+        (attr_type, container), = container.items()
+    if new_value is not None:
+        if isinstance(last, int) and last >= len(container):
+            container.append(new_value)
+        else:
+            container[last] = new_value
+    elif isinstance(last, int):
+        if last < len(container):
+            del container[last]
+    else:
+        container.pop(last, None)
+
+
+# ---- conditions and updates
+
+def _operand(operand, item: Item) -> Optional[dict]:
+    if isinstance(operand, Value):
+        return operand.value
+    elif isinstance(operand, _Path):
+        return _get_path(item, operand)
+    elif isinstance(operand, _Size):
+        value = _operand(operand.values[0], item)
+        if value is None:
+            return None
+        (attr_type, raw), = value.items()
+        return {'N': str(len(raw))}
+    elif isinstance(operand, (_Increment, _Decrement)):
+        lhs, rhs = (_operand(value, item) for value in operand.values)
+        if lhs is None or rhs is None or 'N' not in lhs or 'N' not in rhs:
+            raise ValueError(f'{operand} requires numbers')
+        sign = 1 if isinstance(operand, _Increment) else -1
+        return {'N': str(Decimal(lhs['N']) + sign * Decimal(rhs['N']))}
+    elif isinstance(operand, _IfNotExists):
+        existing = _operand(operand.values[0], item)
+        return existing if existing is not None else _operand(operand.values[1], item)
+    elif isinstance(operand, _ListAppend):
+        first, second = (_operand(value, item) for value in operand.values)
+        return {'L': list((first or {'L': []})['L']) + list((second or {'L': []})['L'])}
+    raise NotImplementedError(f'unsupported operand {operand!r}')
+
+
+def evaluate(condition: Optional[Condition], item: Optional[Item]) -> bool:
+    """Evaluate a pynamodb condition against an item; a missing item has no attributes"""
+    if condition is None:
+        return True
+    item = item or {}
+
+    if isinstance(condition, And):
+        return all(evaluate(sub_condition, item) for sub_condition in condition.values)
+    elif isinstance(condition, Or):
+        return any(evaluate(sub_condition, item) for sub_condition in condition.values)
+    elif isinstance(condition, Not):
+        return not evaluate(condition.values[0], item)
+    elif isinstance(condition, Exists):
+        return _get_path(item, condition.values[0]) is not None
+    elif isinstance(condition, NotExists):
+        return _get_path(item, condition.values[0]) is None
+
+    values = [_operand(operand, item) for operand in condition.values]
+    if isinstance(condition, Comparison):
+        a, b = values
+        if condition.operator == '=':
+            return _equal(a, b)
+        elif condition.operator == '<>':
+            return not _equal(a, b)
+        elif not _ordered(a, b):
+            return False
+        a, b = _plain(a), _plain(b)
+        return {'<': a < b, '<=': a <= b, '>': a > b, '>=': a >= b}[condition.operator]
+    elif isinstance(condition, Between):
+        value, lower, upper = values
+        return _ordered(value, lower) and _ordered(value, upper) and _plain(lower) <= _plain(value) <= _plain(upper)
+    elif isinstance(condition, In):
+        return any(_equal(values[0], candidate) for candidate in values[1:])
+    elif isinstance(condition, IsType):
+        return values[0] is not None and next(iter(values[0])) == _plain(values[1])
+    elif isinstance(condition, BeginsWith):
+        value, prefix = values
+        return _ordered(value, prefix) and next(iter(value)) != 'N' and _plain(value).startswith(_plain(prefix))
+    elif isinstance(condition, Contains):
+        value, operand = values
+        if value is None or operand is None:
+            return False
+        attr_type = next(iter(value))
+        if attr_type in ('S', 'B'):
+            return _ordered(value, operand) and _plain(operand) in _plain(value)
+        elif attr_type in ('SS', 'NS', 'BS'):
+            return _plain(operand) in _plain(value)
+        elif attr_type == 'L':
+            return any(_equal(element, operand) for element in value['L'])
+        return False
+    raise NotImplementedError(f'unsupported condition {condition!r}')
+
+
+def _set_union(attr_type: str, a: Sequence, b: Sequence) -> List:
+    if attr_type == 'NS':
+        known = {Decimal(element) for element in a}
+        return list(a) + [element for element in b if Decimal(element) not in known]
+    return list(a) + [element for element in b if element not in set(a)]
+
+
+def _set_difference(attr_type: str, a: Sequence, b: Sequence) -> List:
+    if attr_type == 'NS':
+        removed = {Decimal(element) for element in b}
+        return [element for element in a if Decimal(element) not in removed]
+    return [element for element in a if element not in set(b)]
+
+
+def apply(actions: Iterable[Action], item: Item) -> Item:
+    """Apply pynamodb update actions to a copy of an item"""
+    item = _loads_item(_dumps_item(item))
+    for action in actions:
+        path = action.values[0]
+        if isinstance(action, SetAction):
+            _set_path(item, path, _operand(action.values[1], item))
+        elif isinstance(action, RemoveAction):
+            _set_path(item, path, None)
+        elif isinstance(action, (AddAction, DeleteAction)):
+            existing = _get_path(item, path)
+            (attr_type, raw), = action.values[1].value.items()
+            if isinstance(action, AddAction):
+                if existing is None:
+                    new_value = {attr_type: raw}
+                elif attr_type == 'N':
+                    new_value = {'N': str(Decimal(existing['N']) + Decimal(raw))}
+                else:
+                    new_value = {attr_type: _set_union(attr_type, existing[attr_type], raw)}
+            elif existing is None:
+                continue
+            else:
+                remaining = _set_difference(attr_type, existing[attr_type], raw)
+                # sets cannot be empty
+                new_value = {attr_type: remaining} if remaining else None
+            _set_path(item, path, new_value)
+        else:
+            raise NotImplementedError(f'unsupported action {action!r}')
+    return item
+
+
+def _conditional_check_failed(error_class: type, table_name: str, operation_name: str):
+    return error_class(cause=VerboseClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        operation_name, {'table_name': table_name, 'request_id': 'sqlite'}))
+
+
+# ---- storage
+
+class SQLiteStorage:
+    """A SQLite database holding any number of model tables
+
+    One connection is shared by all threads of the process, and every operation holds a lock, so operations are
+    atomic within the process. Writes use ``BEGIN IMMEDIATE`` so they are also atomic between processes.
+    """
+
+    def __init__(self, path: Union[str, Path] = ':memory:'):
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.create_function('bugdex_segment', 2, lambda key, total: zlib.crc32(key.encode()) % total,
+                                 deterministic=True)
+        self._lock = threading.RLock()
+        self._in_write = False
+        self._tables: Dict[str, SQLiteTableConnection] = {}
+
+    def table(self, model_cls: Type[pynamodb.models.Model]) -> SQLiteTableConnection:
+        """The table connection for `model_cls`, creating the table if necessary"""
+        with self._lock:
+            table_name = model_cls.Meta.table_name
+            if table_name not in self._tables:
+                self._tables[table_name] = SQLiteTableConnection(self, model_cls)
+            return self._tables[table_name]
+
+    def transact_write(self) -> SQLiteTransactWrite:
+        return SQLiteTransactWrite(self)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Hold the lock and a write transaction, unless already inside one"""
+        with self._lock:
+            if self._in_write:
+                yield self._db
+                return
+            self._db.execute('BEGIN IMMEDIATE')
+            self._in_write = True
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            else:
+                self._db.execute('COMMIT')
+            finally:
+                self._in_write = False
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class SQLiteTableConnection:
+    """Drop-in for `pynamodb.connection.TableConnection`, backed by a table of a `SQLiteStorage`
+
+    Assigned to ``Model._connection`` by `use_sqlite`.
+    """
+
+    def __init__(self, storage: SQLiteStorage, model_cls: Type[pynamodb.models.Model]):
+        self.storage = storage
+        self.model_cls = model_cls
+        self.table_name: str = model_cls.Meta.table_name
+        self._sql_table = '"{}"'.format(self.table_name.replace('"', '""'))
+
+        self._hash_key = model_cls._hash_key_attribute()
+        self._range_key = model_cls._range_key_attribute()
+        self._key_names = [self._hash_key.attr_name] + ([self._range_key.attr_name] if self._range_key else [])
+
+        self._index_keys: Dict[str, Tuple[Any, Any]] = {}
+        self._index_expressions: Dict[str, Tuple[str, Optional[str]]] = {}
+        for index_name, index in model_cls._indexes.items():
+            hash_key = index._hash_key_attribute()
+            range_key = next((attribute for attribute in index.Meta.attributes.values() if attribute.is_range_key), None)
+            self._index_keys[index_name] = hash_key, range_key
+            self._index_expressions[index_name] = (
+                self._json_path(hash_key), self._json_path(range_key) if range_key else None)
+
+        self.create_table()
+
+    @staticmethod
+    def _json_path(attribute) -> str:
+        return "json_extract(item, '$.\"{}\".{}')".format(attribute.attr_name, attribute.attr_type)
+
+    # -- keys
+
+    def _row_key(self, hash_key: Any, range_key: Any = None) -> Tuple[str, str]:
+        return str(hash_key), '' if range_key is None else str(range_key)
+
+    def _key_item(self, hash_key: Any, range_key: Any = None) -> Item:
+        """Item with just the keys, which are serialized as by `Model._serialize_keys`"""
+        item = {self._hash_key.attr_name: {self._hash_key.attr_type: hash_key}}
+        if self._range_key is not None and range_key is not None:
+            item[self._range_key.attr_name] = {self._range_key.attr_type: range_key}
+        return item
+
+    def _item_row_key(self, item: Item) -> Tuple[str, str]:
+        hash_value = item[self._hash_key.attr_name][self._hash_key.attr_type]
+        range_value = item[self._range_key.attr_name][self._range_key.attr_type] if self._range_key else None
+        if isinstance(hash_value, bytes) or isinstance(range_value, bytes):
+            raise NotImplementedError('binary keys are not supported')
+        return self._row_key(hash_value, range_value)
+
+    def _raw_key(self, key: Mapping) -> Tuple[str, str]:
+        """Row key of a key mapping whose values are raw or typed"""
+        def raw(value):
+            return next(iter(value.values())) if isinstance(value, dict) else value
+        return self._row_key(raw(key[self._hash_key.attr_name]),
+                             raw(key[self._range_key.attr_name]) if self._range_key else None)
+
+    # -- single items
+
+    def _read(self, row_key: Tuple[str, str]) -> Optional[Item]:
+        row = self.storage._db.execute(
+            f'SELECT item FROM {self._sql_table} WHERE hash_key = ? AND range_key = ?', row_key).fetchone()
+        return _loads_item(row[0]) if row else None
+
+    def _write_item(self, item: Item):
+        self.storage._db.execute(
+            f'INSERT OR REPLACE INTO {self._sql_table} (hash_key, range_key, item) VALUES (?, ?, ?)',
+            (*self._item_row_key(item), _dumps_item(item)))
+
+    def _delete_row(self, row_key: Tuple[str, str]):
+        self.storage._db.execute(f'DELETE FROM {self._sql_table} WHERE hash_key = ? AND range_key = ?', row_key)
+
+    @staticmethod
+    def _project(item: Item, attributes_to_get: Optional[Iterable[str]]) -> Item:
+        if attributes_to_get is None:
+            return item
+        attributes_to_get = set(attributes_to_get)
+        return {name: value for name, value in item.items() if name in attributes_to_get}
+
+    def get_item(self, hash_key: str, range_key: Optional[str] = None, consistent_read: bool = False,
+                 attributes_to_get: Optional[Any] = None) -> Dict:
+        with self.storage._lock:
+            item = self._read(self._row_key(hash_key, range_key))
+        return {ITEM: self._project(item, attributes_to_get)} if item is not None else {}
+
+    def put_item(self, hash_key: str, range_key: Optional[str] = None, attributes: Optional[Any] = None,
+                 condition: Optional[Condition] = None, **kwargs) -> Dict:
+        item = {**self._key_item(hash_key, range_key), **(attributes or {})}
+        with self.storage._write():
+            if not evaluate(condition, self._read(self._row_key(hash_key, range_key))):
+                raise _conditional_check_failed(PutError, self.table_name, 'PutItem')
+            self._write_item(item)
+        return {}
+
+    def update_item(self, hash_key: str, range_key: Optional[str] = None, actions: Optional[Sequence[Action]] = None,
+                    condition: Optional[Condition] = None, return_values: Optional[str] = None, **kwargs) -> Dict:
+        row_key = self._row_key(hash_key, range_key)
+        with self.storage._write():
+            existing = self._read(row_key)
+            if not evaluate(condition, existing):
+                raise _conditional_check_failed(UpdateError, self.table_name, 'UpdateItem')
+            # like DynamoDB, updating a missing item creates it
+            item = apply(actions or (), existing or self._key_item(hash_key, range_key))
+            self._write_item(item)
+        return {ATTRIBUTES: item}
+
+    def delete_item(self, hash_key: str, range_key: Optional[str] = None, condition: Optional[Condition] = None,
+                    **kwargs) -> Dict:
+        row_key = self._row_key(hash_key, range_key)
+        with self.storage._write():
+            if not evaluate(condition, self._read(row_key)):
+                raise _conditional_check_failed(DeleteError, self.table_name, 'DeleteItem')
+            self._delete_row(row_key)
+        return {}
+
+    # -- batches
+
+    def batch_get_item(self, keys: Sequence[Mapping], consistent_read: Optional[bool] = None,
+                       attributes_to_get: Optional[Any] = None, **kwargs) -> Dict:
+        with self.storage._lock:
+            items = [item for item in (self._read(self._raw_key(key)) for key in keys) if item is not None]
+        return {RESPONSES: {self.table_name: [self._project(item, attributes_to_get) for item in items]},
+                UNPROCESSED_KEYS: {}}
+
+    def batch_write_item(self, put_items: Optional[Any] = None, delete_items: Optional[Any] = None, **kwargs) -> Dict:
+        with self.storage._write():
+            for item in put_items or ():
+                self._write_item(item)
+            for key in delete_items or ():
+                self._delete_row(self._raw_key(key))
+        return {UNPROCESSED_ITEMS: {}}
+
+    # -- query and scan
+
+    def _page(self, items: List[Item], filter_condition: Optional[Condition], attributes_to_get,
+              last_item: Optional[Item]) -> Dict:
+        matching = [self._project(item, attributes_to_get) for item in items if evaluate(filter_condition, item)]
+        page = {ITEMS: matching, CAMEL_COUNT: len(matching), SCANNED_COUNT: len(items)}
+        if last_item is not None:
+            page[LAST_EVALUATED_KEY] = {name: value for name, value in last_item.items()
+                                        if name in self._key_names or name in self._index_key_names()}
+        return page
+
+    def _index_key_names(self) -> List[str]:
+        return [attribute.attr_name for keys in self._index_keys.values() for attribute in keys if attribute]
+
+    def _index_projection(self, index_name: Optional[str], item: Item) -> Item:
+        if index_name is None:
+            return item
+        projection = self.model_cls._indexes[index_name].Meta.projection
+        if projection.projection_type == 'ALL':
+            return item
+        names = set(self._key_names) | {attribute.attr_name for attribute in self._index_keys[index_name] if attribute}
+        names |= set(getattr(projection, 'non_key_attributes', None) or ())
+        return {name: value for name, value in item.items() if name in names}
+
+    def query(self, hash_key: str, range_key_condition: Optional[Condition] = None,
+              filter_condition: Optional[Any] = None, attributes_to_get: Optional[Any] = None,
+              consistent_read: bool = False, exclusive_start_key: Optional[Any] = None,
+              index_name: Optional[str] = None, limit: Optional[int] = None,
+              scan_index_forward: Optional[bool] = None, select: Optional[str] = None, **kwargs) -> Dict:
+        if index_name is None:
+            range_key = self._range_key
+            sql = f'SELECT item FROM {self._sql_table} WHERE hash_key = ?'
+        else:
+            range_key = self._index_keys[index_name][1]
+            sql = f'SELECT item FROM {self._sql_table} WHERE {self._index_expressions[index_name][0]} = ?'
+
+        with self.storage._lock:
+            items = [self._index_projection(index_name, _loads_item(row[0]))
+                     for row in self.storage._db.execute(sql, (hash_key,))]
+
+        def sort_key(item: Item):
+            return (_sort_key(item.get(range_key.attr_name)) if range_key else (),
+                    self._item_row_key(item))
+
+        items = sorted((item for item in items if evaluate(range_key_condition, item)), key=sort_key,
+                       reverse=scan_index_forward is False)
+
+        if exclusive_start_key:
+            start = sort_key(exclusive_start_key)
+            items = [item for item in items
+                     if (sort_key(item) < start if scan_index_forward is False else sort_key(item) > start)]
+
+        last_item = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            last_item = items[-1]
+
+        return self._page(items, filter_condition, attributes_to_get, last_item)
+
+    def scan(self, filter_condition: Optional[Any] = None, attributes_to_get: Optional[Any] = None,
+             limit: Optional[int] = None, segment: Optional[int] = None, total_segments: Optional[int] = None,
+             exclusive_start_key: Optional[str] = None, consistent_read: Optional[bool] = None,
+             index_name: Optional[str] = None, **kwargs) -> Dict:
+        clauses, parameters = [], []
+        if total_segments:
+            clauses.append('bugdex_segment(hash_key, ?) = ?')
+            parameters += [total_segments, segment]
+        if index_name is not None:
+            clauses.extend(f'{expression} IS NOT NULL' for expression in self._index_expressions[index_name] if expression)
+        if exclusive_start_key:
+            clauses.append('(hash_key, range_key) > (?, ?)')
+            parameters += self._raw_key(exclusive_start_key)
+
+        sql = f'SELECT item FROM {self._sql_table}'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY hash_key, range_key'
+        if limit is not None:
+            # one more row tells whether there is another page
+            sql += ' LIMIT ?'
+            parameters.append(limit + 1)
+
+        with self.storage._lock:
+            items = [self._index_projection(index_name, _loads_item(row[0]))
+                     for row in self.storage._db.execute(sql, parameters)]
+
+        last_item = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            last_item = items[-1]
+
+        return self._page(items, filter_condition, attributes_to_get, last_item)
+
+    # -- tables
+
+    def create_table(self, *args, **kwargs) -> Dict:
+        with self.storage._lock:
+            db = self.storage._db
+            db.execute(f'CREATE TABLE IF NOT EXISTS {self._sql_table} ('
+                       'hash_key TEXT NOT NULL, range_key TEXT NOT NULL, item TEXT NOT NULL, '
+                       'PRIMARY KEY (hash_key, range_key))')
+            for index_name, expressions in self._index_expressions.items():
+                sql_index = '"{}"'.format(f'{self.table_name}__{index_name}'.replace('"', '""'))
+                db.execute(f'CREATE INDEX IF NOT EXISTS {sql_index} ON {self._sql_table} '
+                           f'({", ".join(expression for expression in expressions if expression)})')
+        return self.describe_table()
+
+    def describe_table(self) -> Dict:
+        with self.storage._lock:
+            try:
+                count, = self.storage._db.execute(f'SELECT count(*) FROM {self._sql_table}').fetchone()
+            except sqlite3.OperationalError:
+                raise TableDoesNotExist(self.table_name)
+        return {'TableName': self.table_name, TABLE_STATUS: 'ACTIVE', ITEM_COUNT: count}
+
+    def delete_table(self) -> Dict:
+        with self.storage._lock:
+            self.storage._db.execute(f'DROP TABLE IF EXISTS {self._sql_table}')
+        return {}
+
+    def update_time_to_live(self, ttl_attr_name: str) -> Dict:
+        return {}
+
+    def get_operation_kwargs(self, *args, **kwargs):
+        raise NotImplementedError('use SQLiteStorage.transact_write instead of pynamodb transactions')
+
+
+class SQLiteTransactWrite:
+    """Same interface as `pynamodb.transactions.TransactWrite`, committed in one SQLite transaction
+
+    All conditions are checked before any write. If one fails, nothing is written and `TransactWriteError` is raised
+    with a ``ConditionalCheckFailed`` cancellation reason for each failed item.
+    """
+
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        self._operations: List[Tuple[str, pynamodb.models.Model, Optional[Condition], Any]] = []
+
+    def __enter__(self) -> SQLiteTransactWrite:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self._commit()
+
+    def condition_check(self, model_cls: Type[pynamodb.models.Model], hash_key, range_key=None,
+                        condition: Optional[Condition] = None):
+        if condition is None:
+            raise TypeError('`condition` cannot be None')
+        model = model_cls(hash_key, range_key=range_key) if range_key is not None else model_cls(hash_key)
+        self._operations.append(('check', model, condition, None))
+
+    def save(self, model: pynamodb.models.Model, condition: Optional[Condition] = None, **kwargs):
+        self._operations.append(('save', model, condition, model.serialize()))
+
+    def update(self, model: pynamodb.models.Model, actions: List[Action], condition: Optional[Condition] = None,
+               **kwargs):
+        self._operations.append(('update', model, condition, actions))
+
+    def delete(self, model: pynamodb.models.Model, condition: Optional[Condition] = None, **kwargs):
+        self._operations.append(('delete', model, condition, None))
+
+    def _commit(self):
+        from .core import _invalidate
+
+        try:
+            with self.storage._write():
+                targets = []
+                for kind, model, condition, argument in self._operations:
+                    table = self.storage.table(type(model))
+                    row_key = table._row_key(*model._get_serialized_keys())
+                    targets.append((table, row_key, table._read(row_key)))
+
+                reasons = [
+                    None if evaluate(condition, existing) else CancellationReason(code='ConditionalCheckFailed')
+                    for (kind, model, condition, argument), (table, row_key, existing) in zip(self._operations, targets)
+                ]
+                if any(reasons):
+                    raise TransactWriteError('Failed to write transaction items', cause=VerboseClientError(
+                        {'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'}},
+                        'TransactWriteItems', {'table_name': 'sqlite', 'request_id': 'sqlite'},
+                        cancellation_reasons=reasons))
+
+                for (kind, model, condition, argument), (table, row_key, existing) in zip(self._operations, targets):
+                    if kind == 'save':
+                        table._write_item(argument)
+                    elif kind == 'update':
+                        table._write_item(apply(argument, existing or table._key_item(*model._get_serialized_keys())))
+                    elif kind == 'delete':
+                        table._delete_row(row_key)
+        finally:
+            for kind, model, condition, argument in self._operations:
+                if kind != 'check':
+                    _invalidate(model)
+
+
+def default_models() -> List[Type[pynamodb.models.Model]]:
+    from .core import CanonicalBug, FormerCanonicalBug, UniversalBug
+    from .jira_tools import JiraBug, JiraSyncCheckpoint
+    return [CanonicalBug, FormerCanonicalBug, UniversalBug, JiraBug, JiraSyncCheckpoint]
+
+
+def use_sqlite(storage: Union[SQLiteStorage, str, Path] = ':memory:',
+               models: Optional[Iterable[Type[pynamodb.models.Model]]] = None) -> SQLiteStorage:
+    """Store `models` (by default, all bugdex models) in SQLite instead of DynamoDB
+
+    :param storage: a `SQLiteStorage`, or the path of its database file
+    :return: the storage
+    """
+    from . import core
+
+    if not isinstance(storage, SQLiteStorage):
+        storage = SQLiteStorage(storage)
+
+    for model_cls in default_models() if models is None else models:
+        model_cls._connection = storage.table(model_cls)
+    core.set_transaction_factory(storage.transact_write)
+    core.clear_cache()
+    return storage
+
+
+def use_dynamodb(models: Optional[Iterable[Type[pynamodb.models.Model]]] = None):
+    """Undo `use_sqlite`"""
+    from . import core
+
+    for model_cls in default_models() if models is None else models:
+        model_cls._connection = None
+    core.set_transaction_factory(None)
+    core.clear_cache()
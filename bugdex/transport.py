@@ -0,0 +1,191 @@
+"""HTTP transport for the Jira client
+
+`JiraTransport` is a `requests` adapter with a connection pool sized for the number of threads that share one
+`JIRA` client. It retries rate-limited (429) and unavailable (503) responses with exponential backoff and full jitter,
+waiting at least as long as the server's ``Retry-After``. It also counts requests, retries and latency per endpoint.
+
+Mount it with `mount_transport`; `jira_tools.connect_to_jira` does so for every client it creates.
+"""
+
+from __future__ import annotations
+
+import datetime
+import email.utils
+import random
+import re
+import threading
+import time
+from typing import AbstractSet, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import attr
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+
+from jira import JIRA
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS: AbstractSet[str] = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+_id_segment = re.compile(r'^(\d+|[A-Z][A-Z0-9_]*-\d+)$')
+_version_parents = frozenset({'api', 'agile', 'auth'})  # e.g. /rest/api/2/...
+
+
+def endpoint_name(request: PreparedRequest) -> str:
+    """Return the method and path of `request`, with issue keys and numeric IDs replaced by ``{id}``
+
+    e.g. ``GET /rest/api/2/issue/{id}/comment``
+    """
+    segments = urlsplit(request.url).path.split('/')
+    return '{} {}'.format(request.method, '/'.join(
+        '{id}' if _id_segment.match(segment) and previous not in _version_parents else segment
+        for previous, segment in zip([''] + segments, segments)))
+
+
+@attr.s(auto_attribs=True)
+class EndpointStats:
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.requests if self.requests else 0.0
+
+    def __str__(self):
+        return (f'{self.requests} requests, {self.retries} retries, {self.errors} errors, '
+                f'{self.mean_seconds * 1000:.0f}ms mean, {self.max_seconds * 1000:.0f}ms max')
+
+
+class TransportStats:
+    """Thread-safe counters of `EndpointStats` by `endpoint_name`"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, endpoint: str, seconds: Optional[float] = None, retry: bool = False, error: bool = False):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            if seconds is not None:
+                stats.requests += 1
+                stats.total_seconds += seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.retries += retry
+            stats.errors += error
+
+    def snapshot(self) -> Dict[str, EndpointStats]:
+        with self._lock:
+            return {endpoint: attr.evolve(stats) for endpoint, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def __str__(self):
+        return '\n'.join(f'{endpoint}: {stats}' for endpoint, stats in sorted(self.snapshot().items()))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the number of seconds to wait given a ``Retry-After`` header in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(tz=datetime.timezone.utc)).total_seconds())
+
+
+class JiraTransport(HTTPAdapter):
+    """Pooled, keep-alive HTTP adapter that backs off on 429 and 503 responses
+
+    Requests are retried up to `max_retries` times. Rate-limited (429) responses are retried for any method, since the
+    request was not processed; other retry statuses, such as 503, only for idempotent methods, since e.g. a POST that
+    created an issue may have been processed before the failure. The n-th retry waits a random time of up to
+    ``backoff_base * 2 ** n`` seconds, capped at `backoff_max`, or the ``Retry-After`` of the response if that is
+    longer. Responses asking to wait longer than `backoff_max` are returned as they are. Connection errors are only
+    retried for idempotent methods, and requests with streamed bodies (e.g. attachment uploads) are never retried
+    here, since the body cannot be replayed.
+
+    :param pool_size: connections kept open per host; at least the number of threads sharing the client
+    :param stats: counters to update, e.g. to share between clients
+    """
+
+    def __init__(
+            self, pool_size: int = 32, max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 60.0,
+            retry_statuses: AbstractSet[int] = frozenset({429, 503}), stats: Optional[TransportStats] = None,
+            sleep: Callable[[float], None] = time.sleep,
+    ):
+        # pool_block: wait for a free connection instead of opening one that is discarded after use
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.retry_limit = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+        self.stats = TransportStats() if stats is None else stats
+        self._sleep = sleep
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        endpoint = endpoint_name(request)
+        replayable = request.body is None or isinstance(request.body, (bytes, str))
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except ConnectionError:
+                self.stats._record(endpoint, time.perf_counter() - started, error=True)
+                if not (replayable and request.method in IDEMPOTENT_METHODS and attempt < self.retry_limit):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning('connection error on %s; retrying in %.1fs', endpoint, delay)
+            else:
+                self.stats._record(endpoint, time.perf_counter() - started)
+                retryable = response.status_code in self.retry_statuses and (
+                    response.status_code == 429 or request.method in IDEMPOTENT_METHODS)
+                if not (retryable and replayable and attempt < self.retry_limit):
+                    return response
+
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None and retry_after > self.backoff_max:
+                    return response
+                delay = max(retry_after or 0.0, self._backoff(attempt))
+                logger.warning('%s on %s; retrying in %.1fs', response.status_code, endpoint, delay)
+                response.close()
+
+            self.stats._record(endpoint, retry=True)
+            self._sleep(delay)
+            attempt += 1
+
+
+def mount_transport(jira_server: JIRA, transport: Optional[JiraTransport] = None) -> JiraTransport:
+    """Send all requests of `jira_server` through `transport`, and turn off the client's own retries"""
+    transport = JiraTransport() if transport is None else transport
+    session = jira_server._session
+    session.mount('https://', transport)
+    session.mount('http://', transport)
+    session.max_retries = 0
+    return transport
+
+
+def get_transport(jira_server: JIRA) -> Optional[JiraTransport]:
+    """Return the `JiraTransport` mounted on `jira_server`, if any"""
+    adapter = jira_server._session.get_adapter(jira_server.server_url)
+    return adapter if isinstance(adapter, JiraTransport) else None
@@ -7,8 +7,10 @@ from jira import JIRA
 from .jira_tools import JiraBug, BugdexJiraFields, update_bug
 
 
-def update_external_bug_to_jira(jira_server: JIRA, jira_bug: JiraBug, summary: str, description: str, source: Optional[str], external_url: str):
+def update_external_bug_to_jira(jira_server: JIRA, jira_bug: JiraBug, summary: str, description: str, source: Optional[str], external_url: str) -> bool:
     """Call the Jira server to update an existing JiraBug representing a bug from vendor
+
+    :return: whether anything changed; see `update_bug`
     """
 
     metadata_section = textwrap.dedent(f"""
@@ -40,4 +42,4 @@ def update_external_bug_to_jira(jira_server: JIRA, jira_bug: JiraBug, summary: s
     )
 
     print('updating bug')
-    update_bug(jira_server, jira_bug, fields=jira_fields)
+    return update_bug(jira_server, jira_bug, fields=jira_fields)
@@ -0,0 +1,58 @@
+"""Micro-benchmark of `bugdex.serializing`
+
+Compares `represent` and `dumps` with the previous recursive `deep_represent` and with `json.dumps` using
+`CustomEncoder`. Run with ``python testing/bench_serializing.py``.
+"""
+
+import json
+import timeit
+from numbers import Number
+
+import immutables
+
+from bugdex.serializing import CustomEncoder, represent, dumps
+
+
+def recursive_deep_represent(obj, encoder=CustomEncoder()):
+    """`CustomEncoder.deep_represent` before it was made iterative"""
+    if isinstance(obj, (str, Number)):
+        return obj
+
+    default_obj = encoder.default(obj)
+    if isinstance(default_obj, dict):
+        return {recursive_deep_represent(k): recursive_deep_represent(v) for k, v in default_obj.items()}
+    elif isinstance(default_obj, list):
+        return [recursive_deep_represent(elt) for elt in default_obj]
+    else:
+        raise NotImplementedError(f'invalid type {type(default_obj)}')
+
+
+cases = {
+    'Map': immutables.Map(summary='summary', description='description ' * 50, issuetype=immutables.Map(name='Bug')),
+    'set of Maps': {immutables.Map(name=f'component {i}', id=str(i)) for i in range(100)},
+    'nested label sets': immutables.Map(
+        (f'issue {i}', immutables.Map(labels=frozenset(f'label {j}' for j in range(50)),
+                                      components={immutables.Map(name='Web')}))
+        for i in range(200)),
+}
+
+candidates = {
+    'recursive deep_represent': recursive_deep_represent,
+    'represent': represent,
+    'json.dumps(represent(...))': lambda obj: json.dumps(represent(obj)),
+    'json.dumps(cls=CustomEncoder)': lambda obj: json.dumps(obj, cls=CustomEncoder),
+    'dumps': dumps,
+}
+
+
+def main(repeat: int = 5):
+    for case_name, obj in cases.items():
+        print(case_name)
+        for candidate_name, func in candidates.items():
+            number, _ = timeit.Timer(lambda: func(obj)).autorange()
+            best = min(timeit.repeat(lambda: func(obj), number=number, repeat=repeat)) / number
+            print(f'  {candidate_name:<32} {best * 1e6:10.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+from pytest import fixture
+
+from bugdex import storage
+
+
+@fixture
+def sqlite():
+    """Store all bugdex models in an in-memory SQLite database for the duration of the test"""
+    yield storage.use_sqlite()
+    storage.use_dynamodb()
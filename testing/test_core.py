@@ -0,0 +1,283 @@
+from pynamodb.exceptions import TransactWriteError
+from pynamodb.transactions import TransactWrite
+from pytest import fixture, raises
+
+from bugdex import core, storage
+from bugdex.core import CanonicalBug, FormerCanonicalBug, LookupCache, UniversalBug, resolve_canonical
+from bugdex.jira_tools import JiraBug
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(core.time, 'monotonic', clock)
+    return clock
+
+
+@fixture
+def cache(sqlite):
+    yield core.enable_cache(maxsize=100, ttl=60)
+    core.disable_cache()
+
+
+def _universal_bug(universal_id: str, canonical_bug: str) -> UniversalBug:
+    universal_bug = UniversalBug(universal_id=universal_id, canonical_bug=canonical_bug, source='jira',
+                                 source_specific_id=universal_id)
+    universal_bug.save()
+    return universal_bug
+
+
+def test_garbage_collection_does_not_revive_replacements(sqlite):
+    # b is replaced by a, which is replaced by z; a is scanned first
+    _universal_bug('ua', 'z')
+    _universal_bug('ub', 'a')
+    CanonicalBug(uuid='z', other_representations={'ua'}).save()
+    CanonicalBug(uuid='a', other_representations={'ua'}).save()
+    CanonicalBug(uuid='b', other_representations={'ub'}).save()
+
+    report = CanonicalBug.garbage_collect_all()
+
+    assert (report.scanned, report.repointed) == (3, 2)
+    assert CanonicalBug.get_cached('a') is None
+    assert CanonicalBug.get('z').other_representations == {'ua', 'ub'}
+    assert FormerCanonicalBug.get('a').replacement == 'z'
+    assert resolve_canonical('b').uuid == 'z'
+
+
+def test_die_with_dead_replacement(sqlite):
+    CanonicalBug(uuid='z').save()
+    a = CanonicalBug(uuid='a')
+    a.save()
+    a.die(CanonicalBug.get('z'))
+
+    b = CanonicalBug(uuid='b', other_representations={'ub'})
+    b.save()
+    assert b.die(a).uuid == 'z'
+    assert CanonicalBug.get_cached('a') is None
+    assert CanonicalBug.get('z').other_representations == {'ub'}
+    assert FormerCanonicalBug.get('b').replacement == 'z'
+
+
+def test_garbage_collection_of_canonical_bugs_pointing_at_each_other(sqlite):
+    # the representation of each canonical bug points at the other one; a is scanned first
+    _universal_bug('u1', 'b')
+    _universal_bug('u2', 'a')
+    CanonicalBug(uuid='a', other_representations={'u1'}).save()
+    CanonicalBug(uuid='b', other_representations={'u2'}).save()
+
+    report = CanonicalBug.garbage_collect_all()
+
+    assert (report.scanned, report.killed, report.repointed) == (2, 0, 1)
+    assert FormerCanonicalBug.get('a').replacement == 'b'
+    assert FormerCanonicalBug.get_cached('b') is None
+    assert CanonicalBug.get('b').other_representations == {'u1', 'u2'}
+    assert resolve_canonical('a').uuid == 'b'
+
+    b = CanonicalBug.get('b')
+    assert b.die(CanonicalBug(uuid='a')) is b
+    assert CanonicalBug.get('b').other_representations == {'u1', 'u2'}
+
+
+def test_merge_skips_stale_representations(sqlite):
+    _universal_bug('u1', 'c1')
+    _universal_bug('u2', 'c2')
+    _universal_bug('u3', 'c3')
+    target = CanonicalBug(uuid='c1', other_representations={'u1'})
+    target.save()
+    # u3 was moved to c3, and u4 deleted, without updating c2
+    source = CanonicalBug(uuid='c2', other_representations={'u2', 'u3', 'u4'})
+    source.save()
+
+    target.merge(source)
+
+    assert UniversalBug.get('u2').canonical_bug == 'c1'
+    assert UniversalBug.get('u3').canonical_bug == 'c3'
+    assert CanonicalBug.get('c1').other_representations == {'u1', 'u2'}
+    assert FormerCanonicalBug.get('c2').replacement == 'c1'
+
+
+def test_merge_many_with_many_sources(sqlite, monkeypatch):
+    conditions = []
+    update = storage.SQLiteTransactWrite.update
+
+    def recording_update(self, model, actions, condition=None, **kwargs):
+        conditions.append(condition)
+        return update(self, model, actions, condition=condition, **kwargs)
+
+    monkeypatch.setattr(storage.SQLiteTransactWrite, 'update', recording_update)
+
+    target = CanonicalBug(uuid='target', other_representations={'u-target'})
+    target.save()
+    _universal_bug('u-target', 'target')
+    sources = []
+    for i in range(150):
+        _universal_bug(f'u{i}', f'c{i}')
+        sources.append(CanonicalBug(uuid=f'c{i}', other_representations={f'u{i}'}))
+        sources[-1].save()
+
+    assert CanonicalBug.merge_many(target, sources) == {f'u{i}' for i in range(150)}
+
+    # DynamoDB allows at most 100 operands in a condition expression
+    assert all(len(condition.values) <= 100 for condition in conditions if condition is not None)
+    assert {universal_bug.canonical_bug for universal_bug in UniversalBug.scan()} == {'target'}
+    assert len(CanonicalBug.get('target').other_representations) == 151
+    assert CanonicalBug.count() == 1
+
+
+def test_lookup_cache_ttl_and_lru(clock):
+    cache = LookupCache(maxsize=2, ttl=10)
+    cache.put(CanonicalBug, 'c1', CanonicalBug(uuid='c1', other_representations={'u1'}))
+    cache.put(CanonicalBug, 'absent', None)
+
+    found, bug = cache.get(CanonicalBug, 'c1')
+    assert found and bug.other_representations == {'u1'}
+    assert cache.get(CanonicalBug, 'absent') == (True, None)
+
+    # 'c1' was used least recently
+    cache.get(CanonicalBug, 'absent')
+    cache.put(CanonicalBug, 'c2', CanonicalBug(uuid='c2'))
+    assert cache.get(CanonicalBug, 'c1') == (False, None)
+    assert cache.info().currsize == 2
+
+    clock.now += 11
+    assert cache.get(CanonicalBug, 'c2') == (False, None)
+    assert cache.get(CanonicalBug, 'absent') == (False, None)
+    assert cache.info().currsize == 0
+
+
+def test_cached_lookups_are_invalidated_by_writes(cache):
+    assert CanonicalBug.get_cached('c1') is None
+    assert CanonicalBug.get_cached('c1') is None
+    assert cache.info().hits == 1
+
+    # writes that bypass the models are not seen until the entry expires or is invalidated
+    CanonicalBug._get_connection().put_item('c1', attributes={'other_representations': {'SS': ['u0']}})
+    assert CanonicalBug.get_cached('c1') is None
+
+    bug = CanonicalBug(uuid='c1', other_representations={'u1'})
+    bug.save()
+    assert CanonicalBug.get_cached('c1').other_representations == {'u1'}
+
+    bug.update(actions=[CanonicalBug.other_representations.add({'u2'})])
+    assert CanonicalBug.get_cached('c1').other_representations == {'u1', 'u2'}
+
+    bug.delete()
+    assert CanonicalBug.get_cached('c1') is None
+
+    assert CanonicalBug.batch_get_cached(['c2', 'c3']) == {}
+    with CanonicalBug.batch_write() as batch:
+        batch.save(CanonicalBug(uuid='c2'))
+    assert set(CanonicalBug.batch_get_cached(['c2', 'c3'])) == {'c2'}
+
+
+def test_failed_transaction_invalidates(cache):
+    assert CanonicalBug.get_cached('c1') is None
+    _universal_bug('u1', 'c0')
+
+    with raises(TransactWriteError):
+        with core._transact_write() as transaction:
+            transaction.save(CanonicalBug(uuid='c1'))
+            transaction.save(UniversalBug(universal_id='u1', canonical_bug='c1', source='jira', source_specific_id='1'),
+                             condition=UniversalBug.universal_id.does_not_exist())
+
+    assert cache.get(CanonicalBug, 'c1') == (False, None)
+
+
+def test_failed_dynamodb_transaction_invalidates(cache, monkeypatch):
+    def fail(self):
+        raise TransactWriteError('Failed to write transaction items')
+
+    for operation in ('save', 'update', 'delete'):
+        monkeypatch.setattr(TransactWrite, operation, lambda self, model, *args, **kwargs: None)
+    monkeypatch.setattr(TransactWrite, '_commit', fail)
+
+    for uuid in ('c1', 'c2', 'c3'):
+        assert CanonicalBug.get_cached(uuid) is None
+
+    with raises(TransactWriteError):
+        with core._TransactWrite(connection=None) as transaction:
+            transaction.save(CanonicalBug(uuid='c1'))
+            transaction.update(CanonicalBug(uuid='c2'), actions=[])
+            transaction.delete(CanonicalBug(uuid='c3'))
+
+    assert all(cache.get(CanonicalBug, uuid) == (False, None) for uuid in ('c1', 'c2', 'c3'))
+
+
+def test_resolve_canonical_hop_limit(sqlite):
+    hops = core.MAX_REPLACEMENT_HOPS
+    CanonicalBug(uuid='live').save()
+
+    def chain(length: int):
+        # resolving shortcuts the chain, so it is rewritten before each resolution
+        with FormerCanonicalBug.batch_write() as batch:
+            for i in range(length):
+                batch.save(FormerCanonicalBug(uuid=f'c{i}', replacement=f'c{i + 1}' if i + 1 < length else 'live'))
+
+    chain(hops)
+    assert resolve_canonical('c0').uuid == 'live'
+
+    chain(hops + 1)
+    with raises(ValueError):
+        resolve_canonical('c0')
+
+
+def test_deep_delete_many(sqlite):
+    def jira_bug(i: int, universal_id=None) -> JiraBug:
+        bug = JiraBug(id=str(i), key=f'SEC-{i}', project='SEC', summary='summary', issuetype='Bug',
+                      universal_id=universal_id)
+        bug.save()
+        return bug
+
+    _universal_bug('u1', 'c1')
+    _universal_bug('u2', 'c1')
+    _universal_bug('u3', 'c2')
+    CanonicalBug(uuid='c1', other_representations={'u1', 'u2'}).save()
+    CanonicalBug(uuid='c2', other_representations={'u3'}).save()
+    bugs = [jira_bug(1, 'u1'), jira_bug(3, 'u3'), jira_bug(4)]
+    jira_bug(2, 'u2')
+
+    progress = []
+    core.deep_delete_many(bugs, progress=lambda done, total: progress.append((done, total)))
+
+    assert {bug.universal_id for bug in JiraBug.scan()} == {'u2'}
+    assert {bug.universal_id for bug in UniversalBug.scan()} == {'u2'}
+    assert CanonicalBug.get('c1').other_representations == {'u2'}
+    assert CanonicalBug.get_cached('c2') is None
+    # 3 Jira bugs, 2 universal bugs, 1 emptied and 1 shrinking canonical bug
+    assert progress == [(3, 7), (5, 7), (6, 7), (7, 7)]
+
+
+def test_related_bugs_many(sqlite, monkeypatch):
+    for universal_id, canonical_bug in [('u1', 'c1'), ('u2', 'c1'), ('u3', 'c1'), ('u4', 'c2')]:
+        _universal_bug(universal_id, canonical_bug)
+    jira_bugs = [JiraBug(id=str(i), key=f'SEC-{i}', project='SEC', summary='summary', issuetype='Bug',
+                         universal_id=f'u{i}') for i in (1, 2, 4)]
+    universal_bug = UniversalBug.get('u3')
+
+    queried = []
+    query = UniversalBug.canonical_bug_index.query
+
+    def recording_query(hash_key, *args, **kwargs):
+        queried.append(hash_key)
+        return query(hash_key, *args, **kwargs)
+
+    monkeypatch.setattr(UniversalBug.canonical_bug_index, 'query', recording_query)
+
+    related = core.related_bugs_many(jira_bugs + [universal_bug])
+
+    assert sorted(queried) == ['c1', 'c2']
+    assert {bug.key: sorted(member.universal_id for member in related[bug]) for bug in jira_bugs} == {
+        'SEC-1': ['u2', 'u3'], 'SEC-2': ['u1', 'u3'], 'SEC-4': []}
+    assert sorted(member.universal_id for member in related[universal_bug]) == ['u1', 'u2']
+
+    with raises(ValueError):
+        core.related_bugs_many([JiraBug(id='5', key='SEC-5', project='SEC', summary='summary', issuetype='Bug',
+                                        universal_id='u5')])
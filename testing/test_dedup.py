@@ -0,0 +1,73 @@
+from bugdex.core import CanonicalBug, UniversalBug
+from bugdex.dedup import DedupIndex, MinHasher, merge_clusters, shingles, similarity, lsh_bands
+from bugdex.jira_tools import JiraBug
+
+xss = 'Reflected XSS in the search page: the q parameter is echoed into the results page without escaping.'
+xss_again = 'Reflected XSS on search page - the "q" parameter is echoed into the results page without any escaping'
+sqli = 'SQL injection in the export endpoint: the sort column is interpolated into the ORDER BY clause.'
+csrf = 'Missing CSRF token on the account settings form allows changing the email address of a logged in user.'
+
+
+def _bug(i: int, text: str) -> JiraBug:
+    return JiraBug(id=str(i), key=f'SEC-{i}', project='SEC', summary=text, issuetype='Bug', universal_id=f'u{i}')
+
+
+def test_minhash():
+    hasher = MinHasher(num_perm=256)
+    a, b = shingles(xss), shingles(xss_again)
+    jaccard = len(a & b) / len(a | b)
+
+    assert abs(similarity(hasher.signature(xss), hasher.signature(xss_again)) - jaccard) < 0.1
+    assert similarity(hasher.signature(xss), hasher.signature(sqli)) < 0.2
+    assert hasher.signature(xss) == MinHasher(num_perm=256).signature(xss.upper())
+    assert lsh_bands(128, 0.5) == 32
+
+
+def test_index():
+    index = DedupIndex()
+    assert index.add(_bug(1, xss)) == []
+    assert index.add(_bug(2, sqli)) == []
+    assert [key for key, _score in index.add(_bug(3, xss_again))] == ['u1']
+
+    bugs = [_bug(4, csrf), _bug(5, csrf + ' Reported twice.'), _bug(6, xss)]
+    assert list(index.watch(iter(bugs))) == bugs
+
+    clusters = index.clusters()
+    assert [cluster.members for cluster in clusters] == [{'u1', 'u3', 'u6'}, {'u4', 'u5'}]
+    assert all(0.5 <= cluster.score <= 1 for cluster in clusters)
+
+    index.remove('u6')
+    index.add(_bug(3, sqli + ' Also in the import endpoint.'))
+    assert {frozenset(cluster.members) for cluster in index.clusters()} == {
+        frozenset({'u2', 'u3'}), frozenset({'u4', 'u5'})}
+
+
+def test_process_pool():
+    bugs = [_bug(i, text) for i, text in enumerate([xss, xss_again, sqli, csrf] * 3)]
+    serial, pooled = DedupIndex(), DedupIndex()
+    serial.add_many(bugs)
+    pooled.add_many(bugs, max_workers=2, chunksize=2)
+    assert serial.pairs() == pooled.pairs()
+
+
+def test_merge_clusters(sqlite):
+    bugs = [_bug(1, xss), _bug(2, xss_again), _bug(3, sqli)]
+    for bug in bugs:
+        UniversalBug.propose(universal_id=bug.universal_id, source='jira', source_specific_id=bug.id)
+
+    index = DedupIndex()
+    index.add_many(bugs)
+    (target, sources), = merge_clusters(index.clusters())
+
+    assert UniversalBug.get('u1').canonical_bug == UniversalBug.get('u2').canonical_bug == target.uuid
+    assert UniversalBug.get('u3').canonical_bug != target.uuid
+    assert CanonicalBug.get(target.uuid).other_representations == {'u1', 'u2'}
+    assert merge_clusters(index.clusters()) == []
+
+
+def test_texts_without_shingles_are_not_indexed():
+    index = DedupIndex()
+    index.add_many([_bug(1, '???'), _bug(2, '!!!'), _bug(3, xss)])
+    assert index.add(_bug(4, '...')) == []
+    assert 'u1' not in index and len(index) == 1
+    assert index.clusters() == []
@@ -0,0 +1,50 @@
+import stat
+
+from bugdex import environment_tools
+
+
+class FakeSSM:
+    def __init__(self):
+        self.calls = 0
+
+    def get_parameters(self, Names, WithDecryption):
+        self.calls += 1
+        return {
+            'Parameters': [{'Name': name, 'Value': name.rsplit('/', 1)[-1]} for name in Names],
+            'InvalidParameters': [],
+        }
+
+
+class FakeSession:
+    def __init__(self, ssm):
+        self.ssm = ssm
+
+    def client(self, service_name, region_name=None):
+        return self.ssm
+
+
+def test_get_credentials_is_cached(tmp_path, monkeypatch):
+    ssm = FakeSSM()
+    monkeypatch.setattr(environment_tools, 'get_session', lambda: FakeSession(ssm))
+    monkeypatch.setattr(environment_tools, 'credentials_path', tmp_path / 'credentials.json')
+    monkeypatch.setattr(environment_tools, '_credentials', {})
+
+    assert environment_tools.get_credentials('/jira/user', '/jira/pass') == ('user', 'pass')
+    assert environment_tools.get_credentials('/jira/user', '/jira/pass') == ('user', 'pass')
+    assert ssm.calls == 1
+    assert stat.S_IMODE((tmp_path / 'credentials.json').stat().st_mode) == 0o600
+
+    # a new process reads the file instead of calling SSM
+    environment_tools._credentials.clear()
+    assert environment_tools.get_credentials('/jira/user', '/jira/pass') == ('user', 'pass')
+    assert ssm.calls == 1
+
+    environment_tools.get_credentials('/jira/user', '/jira/pass', refresh=True)
+    assert ssm.calls == 2
+
+    environment_tools.get_credentials('/jira/user', '/jira/pass', ttl=-1, refresh=True)
+    environment_tools.get_credentials('/jira/user', '/jira/pass')
+    assert ssm.calls == 4
+
+    environment_tools.clear_credentials()
+    assert not (tmp_path / 'credentials.json').exists()
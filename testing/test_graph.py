@@ -0,0 +1,80 @@
+from pytest import raises
+
+from bugdex.core import CanonicalBug, UniversalBug
+from bugdex.graph import UnionFind, BugGraph
+
+
+def test_union_find():
+    sets = UnionFind()
+
+    for item in range(10):
+        sets.add(item)
+
+    sets.union(0, 1)
+    sets.union(2, 3)
+    sets.union(1, 3)
+
+    assert sets.find(0) == sets.find(3)
+    assert sets.find(0) != sets.find(4)
+    assert sets.size(2) == 4
+    assert sets.size(9) == 1
+    assert len(sets) == 10
+
+
+def test_bug_graph():
+    graph = BugGraph()
+
+    graph.add_canonical_bug('c1')
+    graph.add_canonical_bug('c2')
+    graph.add_former_canonical_bug('c0', replacement='c1')
+    graph.add_universal_bug('u1', 'c1')
+    graph.add_universal_bug('u2', 'c0')
+    graph.add_universal_bug('u3', 'c2')
+
+    assert graph.find_canonical('u2') == 'c1'
+    assert graph.find_canonical('c0') == 'c1'
+    assert graph.cluster('u1') == {'u1', 'u2'}
+    assert graph.cluster_size('c2') == 1
+    assert not graph.same_bug('u1', 'u3')
+
+    with raises(KeyError):
+        graph.find_canonical('unknown')
+
+
+def test_bug_graph_observe():
+    graph = BugGraph()
+
+    graph.observe_propose(UniversalBug(universal_id='u1', canonical_bug='c1', source='jira', source_specific_id='1'))
+    graph.observe_propose(UniversalBug(universal_id='u2', canonical_bug='c2', source='jira', source_specific_id='2'))
+    graph.observe_propose(UniversalBug(universal_id='u3', canonical_bug='c3', source='jira', source_specific_id='3'))
+
+    graph.observe_merge(
+        CanonicalBug(uuid='c2', other_representations={'u2'}),
+        [CanonicalBug(uuid='c1', other_representations={'u1'}), CanonicalBug(uuid='c3', other_representations={'u3'})],
+    )
+
+    assert graph.same_bug('u1', 'u3')
+    assert graph.cluster_size('u1') == 3
+    assert graph.find_canonical('c1') == 'c2'
+    assert graph.find_canonical('u3') == 'c2'
+
+
+def test_bug_graph_observe_merge_skips_stale_representations():
+    graph = BugGraph()
+    for i in (1, 2, 3):
+        graph.observe_propose(UniversalBug(universal_id=f'u{i}', canonical_bug=f'c{i}', source='jira',
+                                           source_specific_id=str(i)))
+
+    # u3 was moved to c3 without updating c1
+    graph.observe_merge(CanonicalBug(uuid='c2', other_representations={'u2'}),
+                        [CanonicalBug(uuid='c1', other_representations={'u1', 'u3'})])
+
+    assert graph.cluster('u2') == {'u1', 'u2'}
+    assert graph.find_canonical('u3') == 'c3'
+
+    graph.observe_merge(CanonicalBug(uuid='c3', other_representations={'u3'}),
+                        [CanonicalBug(uuid='c2', other_representations={'u1', 'u2', 'u4'})], universal_ids={'u1', 'u2'})
+
+    assert graph.cluster('u3') == {'u1', 'u2', 'u3'}
+    with raises(KeyError):
+        graph.find_canonical('u4')
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# seconds; generous enough for a cold start on a slow machine
+IMPORT_TIME_BUDGET = 1.5
+
+package_root = Path(__file__).resolve().parent.parent
+
+
+def _import_in_subprocess(module: str, home: Path) -> dict:
+    code = (
+        'import json, sys, time\n'
+        't = time.perf_counter()\n'
+        f'import {module}\n'
+        'seconds = time.perf_counter() - t\n'
+        'print(json.dumps(dict(seconds=seconds, modules=sorted(sys.modules))))\n'
+    )
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=str(package_root))
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize('module', ['bugdex', 'bugdex.jira_tools'])
+def test_import_time(module, tmp_path):
+    # no ~/.config/bugdex.json: importing must not read the config
+    result = _import_in_subprocess(module, tmp_path)
+
+    assert result['seconds'] < IMPORT_TIME_BUDGET
+    assert 'pandas' not in result['modules']
+
+
+def test_config_is_lazy(tmp_path):
+    import bugdex.jira_tools
+
+    path = tmp_path / 'bugdex.json'
+    config = bugdex.jira_tools.BugdexConfig(path)
+    path.write_text(json.dumps({'issue_split_id': '10001', 'jira_url': 'https://jira.example.com'}))
+
+    assert config['issue_split_id'] == '10001'
+    assert bugdex.jira_tools.get_config({'issue_split_id': '10002'})['issue_split_id'] == '10002'
+
+    path.write_text(json.dumps({'issue_split_id': '10003'}))
+    assert config['issue_split_id'] == '10001'
+    config.reload()
+    assert config['issue_split_id'] == '10003'
@@ -53,6 +53,7 @@ def test_create_and_delete_jira_bug(jira_server: jira.JIRA):
 
 def test_fill_in_jira_bug(jira_server: jira.JIRA, jira_bug: JiraBug, jira_fields: BugdexJiraFields):
     update_bug(jira_server, jira_bug, jira_fields)
+    assert not update_bug(jira_server, jira_bug, jira_fields)
     issue = jira_bug.to_raw_issue(jira_server)
 
     assert issue.fields.description == jira_fields.description
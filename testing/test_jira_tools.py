@@ -0,0 +1,293 @@
+import datetime
+import hashlib
+import json
+import re
+import time
+from types import SimpleNamespace
+
+from bugdex import jira_tools
+from bugdex.core import CanonicalBug, UniversalBug
+from bugdex.jira_tools import (
+    BugdexJiraFields, JiraBug, JiraMetadataCache, JiraSyncCheckpoint, _get_split_issue, fetch_split_issue_candidates,
+    iter_issues_updated_since, update_bug,
+)
+
+
+class FakeJira:
+    """The parts of `JIRA` that `update_bug` uses, for one issue"""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.fetched = []
+        self.puts = []
+        self._session = SimpleNamespace(put=lambda url, data: self.puts.append((url, json.loads(data))))
+
+    def issue(self, key, fields):
+        self.fetched.append(fields)
+        return SimpleNamespace(fields=SimpleNamespace(**{name: self.fields[name] for name in fields.split(',')}))
+
+    def _get_url(self, path):
+        return f'https://jira.example.com/rest/api/2/{path}'
+
+
+def _bug(**kwargs) -> JiraBug:
+    return JiraBug(id='1', key='SEC-1', project='SEC', summary='summary', description='description',
+                   issuetype='Bug', **kwargs)
+
+
+def _fields(**kwargs) -> BugdexJiraFields:
+    return BugdexJiraFields(summary='summary', description='description', components=[{'name': 'Web'}], **kwargs)
+
+
+def test_update_bug_skips_unchanged_issue(sqlite):
+    labels = {'vendor1', 'ZSecTriaged'}
+    jira_server = FakeJira(labels=list(labels))
+    bug = _bug(labels=labels, components={'Web'})
+
+    assert not update_bug(jira_server, bug, _fields(labels={'vendor1'}))
+    assert jira_server.fetched == ['labels']
+    assert jira_server.puts == []
+
+
+def test_update_bug_keeps_labels_added_in_jira(sqlite):
+    jira_server = FakeJira(labels=['Bugdex', 'vendor1', 'ZSecTriaged'])
+    bug = _bug(labels={'Bugdex', 'vendor1'}, components={'Web'})
+    bug.save()
+
+    assert update_bug(jira_server, bug, _fields(labels={'Bugdex', 'vendor2'}))
+    (url, update_args), = jira_server.puts
+    assert url.endswith('/issue/1')
+    assert update_args == {'update': {'labels': [{'add': 'vendor2'}]}}
+    assert JiraBug.get('1').labels == {'Bugdex', 'vendor1', 'vendor2', 'ZSecTriaged'}
+
+
+class FakeSearch:
+    """`JIRA.search_issues` over issues by key and `updated`, for `incremental_jql` queries in UTC
+
+    :param on_search: called with the number of searches so far after each search, e.g. to update issues
+    """
+
+    def __init__(self, updated, on_search=lambda searches: None):
+        self.updated = updated
+        self.on_search = on_search
+        self.searches = 0
+
+    def search_issues(self, jql_str, startAt, maxResults, **kwargs):
+        bound = re.search(r'updated >= "([^"]+)"', jql_str)
+        bound = bound and datetime.datetime.strptime(bound.group(1), '%Y/%m/%d %H:%M').replace(
+            tzinfo=datetime.timezone.utc)
+        matching = sorted((updated, key) for key, updated in self.updated.items() if bound is None or updated >= bound)
+        page = [SimpleNamespace(key=key, fields=SimpleNamespace(updated=updated.strftime('%Y-%m-%dT%H:%M:%S.%f%z')))
+                for updated, key in matching[startAt:startAt + maxResults]]
+        self.searches += 1
+        self.on_search(self.searches)
+        return page
+
+
+def _at(minute: int) -> datetime.datetime:
+    return datetime.datetime(2024, 1, 1, 10, minute, 30, tzinfo=datetime.timezone.utc)
+
+
+def _keys(jira_server, watermark=None, page_size=2):
+    return [issue.key for issue in iter_issues_updated_since(
+        jira_server, 'labels = AppSec', watermark, page_size=page_size, config_overrides={'jira_timezone': 'UTC'})]
+
+
+def test_iter_issues_updated_since_survives_updates_during_the_run():
+    updated = {f'SEC-{i}': _at(i) for i in range(1, 7)}
+
+    def edit_consumed_issue(searches):
+        if searches == 1:
+            updated['SEC-1'] = _at(10)
+
+    # SEC-1 is yielded again after its update
+    assert _keys(FakeSearch(updated, edit_consumed_issue)) == [f'SEC-{i}' for i in range(1, 7)] + ['SEC-1']
+    assert _keys(FakeSearch(updated), watermark=_at(4)) == ['SEC-4', 'SEC-5', 'SEC-6', 'SEC-1']
+
+
+def test_iter_issues_updated_since_pages_within_a_minute():
+    updated = {f'SEC-{i}': _at(1) for i in range(1, 6)}
+    updated['SEC-6'] = _at(2)
+    assert _keys(FakeSearch(updated), watermark=_at(0)) == [f'SEC-{i}' for i in range(1, 7)]
+
+
+def test_ingest_incremental_ingests_issues_updated_during_the_run(sqlite, monkeypatch):
+    ingested = []
+
+    def ingest_raw_issue(cls, issue, canonical_bug=None):
+        ingested.append((issue.key, issue.fields.updated[11:16]))
+        return JiraBug(id=issue.key, key=issue.key, project='SEC', summary='summary', issuetype='Bug')
+
+    monkeypatch.setattr(JiraBug, '_ingest_raw_issue', classmethod(ingest_raw_issue))
+    monkeypatch.setattr(jira_tools, 'config', {'jira_timezone': 'UTC'})
+    updated = {f'SEC-{i}': _at(i) for i in range(1, 7)}
+
+    def edit_issues(searches):
+        # SEC-1 is edited after it was ingested, then SEC-6 before it is
+        if searches == 2:
+            updated['SEC-1'] = _at(7)
+        elif searches == 3:
+            updated['SEC-6'] = _at(8)
+
+    def keys(jira_server):
+        return [bug.key for bug in JiraBug.ingest_incremental(jira_server, 'labels = AppSec', page_size=2)]
+
+    assert keys(FakeSearch(updated, edit_issues)) == ['SEC-1', 'SEC-2', 'SEC-3', 'SEC-4', 'SEC-5', 'SEC-1', 'SEC-6']
+    assert ('SEC-1', '10:07') in ingested
+    assert JiraSyncCheckpoint.get('labels = AppSec').watermark == _at(8)
+
+    # the next run starts from SEC-6, and SEC-1 is not left behind
+    assert keys(FakeSearch(updated)) == ['SEC-6']
+
+
+def test_missing_split_issue_candidates():
+    existing = {'20': SimpleNamespace(id='20', fields=SimpleNamespace(
+        reporter=SimpleNamespace(key='security.automation'), project=SimpleNamespace(id='PAY')))}
+
+    def search_issues(jql_str, validate_query=True, **kwargs):
+        assert validate_query is False
+        return [existing[issue_id] for issue_id in re.findall(r'\d+', jql_str) if issue_id in existing]
+
+    def issue(*linked_ids):
+        return SimpleNamespace(fields=SimpleNamespace(issuelinks=[
+            SimpleNamespace(type=SimpleNamespace(id='10'), outwardIssue=SimpleNamespace(id=linked_id))
+            for linked_id in linked_ids]))
+
+    jira_server = SimpleNamespace(search_issues=search_issues)
+    overrides = {'issue_split_id': '10'}
+    project = SimpleNamespace(id='PAY')
+
+    # 21 was deleted
+    assert fetch_split_issue_candidates(jira_server, [issue('20'), issue('21')], overrides) == {'20': existing['20']}
+    assert _get_split_issue(jira_server, issue('21'), project, config_overrides=overrides) is None
+    assert _get_split_issue(jira_server, issue('21', '20'), project, config_overrides=overrides) is existing['20']
+
+
+def test_jira_metadata_caches_share_their_file(tmp_path):
+    def metadata(server_url):
+        jira_server = SimpleNamespace(server_url=server_url,
+                                      priorities=lambda: [SimpleNamespace(raw={'id': server_url})])
+        cache = JiraMetadataCache(jira_server, path=tmp_path / 'metadata.json')
+        cache._resource = lambda resource_cls, raw: raw
+        return cache
+
+    one, another = metadata('https://one.example.com'), metadata('https://one.example.com.evil')
+    assert one._store is another._store
+    assert one.priorities() == [{'id': 'https://one.example.com'}]
+    assert another.priorities() == [{'id': 'https://one.example.com.evil'}]
+    assert len(json.loads((tmp_path / 'metadata.json').read_text())) == 2
+
+    one.refresh()
+    assert list(json.loads((tmp_path / 'metadata.json').read_text())) == ['https://one.example.com.evil priorities']
+
+
+def test_update_bug_uses_stored_state_of_issue_without_components(sqlite):
+    jira_server = FakeJira(labels=['ZSecTriaged'])
+    bug = _bug(labels={'ZSecTriaged'}, components=None, components_known=True)
+
+    fields = BugdexJiraFields(summary='summary', description='description', components=[], labels=set())
+    assert not update_bug(jira_server, bug, fields)
+    assert jira_server.fetched == ['labels']
+    assert jira_server.puts == []
+
+    # components were never fetched
+    jira_server = FakeJira(labels=['ZSecTriaged'], summary='summary', description='description', components=[],
+                           issuetype=SimpleNamespace(name='Bug'))
+    bug = _bug(labels={'ZSecTriaged'})
+    assert not update_bug(jira_server, bug, fields)
+    assert jira_server.fetched == ['summary,description,labels,components,issuetype']
+    assert JiraBug.get('1').components_known
+
+
+def _issue(i: int, components=('Web',)):
+    return SimpleNamespace(id=str(i), key=f'SEC-{i}', fields=SimpleNamespace(
+        project=SimpleNamespace(key='SEC'), summary=f'summary {i}', description=None,
+        issuetype=SimpleNamespace(name='Bug'), labels=['AppSec'],
+        components=[SimpleNamespace(name=name) for name in components]))
+
+
+def test_batched_ingest(sqlite, caplog):
+    # SEC-1 is known but missing from its canonical bug, and the canonical bug of SEC-2 is gone
+    JiraBug(id='1', key='SEC-1', project='SEC', summary='summary', issuetype='Bug', universal_id='u1').save()
+    JiraBug(id='2', key='SEC-2', project='SEC', summary='summary', issuetype='Bug', universal_id='u2').save()
+    UniversalBug(universal_id='u1', canonical_bug='c1', source='jira', source_specific_id='1').save()
+    UniversalBug(universal_id='u2', canonical_bug='gone', source='jira', source_specific_id='2').save()
+    CanonicalBug(uuid='c1', other_representations={'u0'}).save()
+
+    issues = [_issue(1), _issue(2), _issue(3, components=()), _issue(3), _issue(4)]
+    bugs = list(JiraBug.ingest(None, issues, batch_size=2))
+
+    assert [bug.key for bug in bugs] == ['SEC-1', 'SEC-2', 'SEC-3', 'SEC-4']
+    assert [bug.universal_id for bug in bugs[:2]] == ['u1', 'u2']
+    assert JiraBug.get('1').summary == 'summary 1'
+    assert JiraBug.get('3').components is None and JiraBug.get('3').components_known
+    assert CanonicalBug.get('c1').other_representations == {'u0', 'u1'}
+    assert 'has no associated canonical bug' in caplog.text
+
+    for bug in bugs[2:]:
+        universal_bug = UniversalBug.get(bug.universal_id)
+        assert (universal_bug.source, universal_bug.source_specific_id) == ('jira', bug.id)
+        assert CanonicalBug.get(universal_bug.canonical_bug).other_representations == {bug.universal_id}
+    assert UniversalBug.count() == 4
+
+
+def test_ingest_on_a_thread_pool_keeps_order_and_bounds_work_in_flight(monkeypatch):
+    def slow_ingest_raw_issue(cls, issue, canonical_bug=None):
+        # later issues finish first
+        time.sleep(0.001 * (5 - int(issue.id) % 5))
+        return JiraBug(id=issue.id, key=issue.key, project='SEC', summary='summary', issuetype='Bug')
+
+    monkeypatch.setattr(JiraBug, '_ingest_raw_issue', classmethod(slow_ingest_raw_issue))
+    pulled = []
+
+    def issues():
+        for i in range(1, 41):
+            pulled.append(i)
+            yield _issue(i)
+
+    keys = []
+    for bug in JiraBug.ingest(None, issues(), max_workers=3):
+        keys.append(bug.key)
+        assert len(pulled) - len(keys) <= 2 * 3
+    assert keys == [f'SEC-{i}' for i in range(1, 41)]
+
+
+def test_copy_attachments_downloads_only_missing_attachments(tmp_path, monkeypatch):
+    monkeypatch.setattr(jira_tools, '_attachment_hashes', jira_tools._JsonFileStore(tmp_path / 'hashes.json'))
+    downloaded, uploaded = [], []
+
+    def attachment(attachment_id, filename, content, sha256_known=False):
+        attachment = SimpleNamespace(
+            id=attachment_id, filename=filename, size=len(content), created='2024-01-01T10:00:00.000+0000',
+            iter_content=lambda chunk_size: downloaded.append(attachment_id) or [content])
+        if sha256_known:
+            jira_tools._put_attachment_sha256(attachment_id, attachment.created, attachment.size,
+                                              hashlib.sha256(content).hexdigest())
+        return attachment
+
+    def add_attachment(issue, attachment, filename):
+        content = attachment.read()
+        uploaded.append((filename, content))
+        return [{'id': f'new-{filename}', 'created': '2024-01-02T10:00:00.000+0000', 'size': len(content)}]
+
+    monkeypatch.setattr(jira_tools, '_add_attachment', add_attachment)
+
+    from_issue = SimpleNamespace(fields=SimpleNamespace(attachment=[
+        attachment('1', 'same-name-and-size.txt', b'abc'),
+        attachment('2', 'same-hash.txt', b'abc', sha256_known=True),
+        attachment('3', 'other-hash.txt', b'new', sha256_known=True),
+        attachment('4', 'missing.txt', b'abcd'),
+    ]))
+    to_issue = SimpleNamespace(fields=SimpleNamespace(attachment=[
+        attachment('11', 'same-name-and-size.txt', b'xyz'),
+        attachment('12', 'same-hash.txt', b'abc', sha256_known=True),
+        attachment('13', 'other-hash.txt', b'old', sha256_known=True),
+    ]))
+
+    jira_tools._copy_attachments(from_issue, to_issue)
+
+    assert downloaded == ['3', '4']
+    assert uploaded == [('other-hash.txt', b'new'), ('missing.txt', b'abcd')]
+    hashes = json.loads((tmp_path / 'hashes.json').read_text())
+    assert hashes['new-missing.txt']['value']['sha256'] == hashlib.sha256(b'abcd').hexdigest()
+    assert hashes['4']['value']['sha256'] == hashlib.sha256(b'abcd').hexdigest()
@@ -1,3 +1,4 @@
+from pytest import raises
 import toolz
 import immutables
 import bugdex.serializing
@@ -25,3 +26,52 @@ def test_custom_encoder():
     assert json.loads(json.dumps(dict(a=1), cls=bugdex.serializing.CustomEncoder)) == dict(a=1)
 
     assert json.loads(json.dumps(immutables.Map(a=1), cls=bugdex.serializing.CustomEncoder)) == dict(a=1)
+
+
+def test_represent():
+    obj = immutables.Map(
+        labels=frozenset({'AppSec'}),
+        components={immutables.Map(name='Web')},
+        issuetype=immutables.Map(name='Bug'),
+        nested=[[[{'a': (1, 2.5, None, True)}]]],
+    )
+
+    assert bugdex.serializing.represent(obj) == dict(
+        labels=['AppSec'],
+        components=[dict(name='Web')],
+        issuetype=dict(name='Bug'),
+        nested=[[[{'a': [1, 2.5, None, True]}]]],
+    )
+    assert bugdex.serializing.represent('a') == 'a'
+
+
+def test_deep_nesting():
+    # deeper than the recursion limit
+    deep = []
+    for _ in range(10000):
+        deep = [deep]
+
+    assert type(bugdex.serializing.represent(deep)) is list
+    assert bugdex.serializing.dumps(deep) == '[' * 10001 + ']' * 10001
+
+
+def test_dumps():
+    cases = [
+        immutables.Map(a=1),
+        {immutables.Map(a=1)},
+        {'a': [1, 2.5, None, True, False, 'é"\n'], 1: {}, None: [], 2.5: ()},
+        [[], {}, [[{'b': immutables.Map(c=frozenset({'x'}))}]]],
+        'a', 1, None,
+    ]
+    for obj in cases:
+        assert bugdex.serializing.dumps(obj) == json.dumps(obj, cls=bugdex.serializing.CustomEncoder)
+
+
+def test_circular_reference():
+    cycle = []
+    cycle.append(cycle)
+
+    with raises(ValueError):
+        bugdex.serializing.represent(cycle)
+    with raises(ValueError):
+        bugdex.serializing.dumps(cycle)
@@ -0,0 +1,83 @@
+from pytest import raises
+from pynamodb.constants import PUT_REQUEST, ITEM, UNPROCESSED_ITEMS
+
+from bugdex import snapshot, storage
+from bugdex.core import CanonicalBug, UniversalBug
+from bugdex.jira_tools import JiraBug
+
+
+def _populate():
+    with UniversalBug.batch_write() as batch:
+        for i in range(60):
+            batch.save(UniversalBug(universal_id=f'u{i}', canonical_bug=f'c{i % 6}', source='jira',
+                                    source_specific_id=str(i)))
+    with CanonicalBug.batch_write() as batch:
+        for i in range(6):
+            batch.save(CanonicalBug(uuid=f'c{i}', other_representations={f'u{j}' for j in range(i, 60, 6)}))
+    JiraBug(id='1', key='SEC-1', project='SEC', summary='summary', issuetype='Bug', labels={'AppSec'}).save()
+
+
+def test_round_trip(sqlite, tmp_path):
+    _populate()
+    manifest = snapshot.export_snapshot(tmp_path, total_segments=3, chunk_items=7, page_size=5)
+
+    assert manifest['tables'][UniversalBug.Meta.table_name]['items'] == 60
+    assert all(file['items'] <= 7 for table in manifest['tables'].values() for file in table['files'])
+    assert snapshot.read_manifest(tmp_path) == manifest
+    with raises(FileExistsError):
+        snapshot.export_snapshot(tmp_path)
+
+    storage.use_sqlite()
+    assert snapshot.import_snapshot(tmp_path, items_per_second=1e6) == {
+        table_name: table['items'] for table_name, table in manifest['tables'].items()}
+
+    assert UniversalBug.count() == 60
+    assert CanonicalBug.get('c1').other_representations == {f'u{j}' for j in range(1, 60, 6)}
+    assert {bug.universal_id for bug in UniversalBug.canonical_bug_index.query('c2')} == {
+        f'u{j}' for j in range(2, 60, 6)}
+    assert JiraBug.get('1').labels == {'AppSec'}
+
+
+def test_import_backs_off_on_unprocessed_items(sqlite, tmp_path, monkeypatch):
+    _populate()
+    snapshot.export_snapshot(tmp_path, tables=[UniversalBug.Meta.table_name], total_segments=1)
+    storage.use_sqlite()
+
+    batch_write_item = storage.SQLiteTableConnection.batch_write_item
+    calls = []
+
+    def flaky_batch_write_item(self, put_items=None, **kwargs):
+        calls.append(len(put_items))
+        if len(calls) == 1:
+            batch_write_item(self, put_items=put_items[:10])
+            return {UNPROCESSED_ITEMS: {self.table_name: [{PUT_REQUEST: {ITEM: item}} for item in put_items[10:]]}}
+        return batch_write_item(self, put_items=put_items, **kwargs)
+
+    monkeypatch.setattr(storage.SQLiteTableConnection, 'batch_write_item', flaky_batch_write_item)
+    snapshot.import_snapshot(tmp_path, items_per_second=1e6, max_workers=1)
+
+    assert calls[:2] == [25, 15]
+    assert UniversalBug.count() == 60
+
+
+def test_adaptive_rate_limiter():
+    now = [0.0]
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        now[0] += seconds
+
+    limiter = snapshot.AdaptiveRateLimiter(100, increase=10, sleep=sleep, clock=lambda: now[0])
+    limiter.acquire(50)
+    limiter.acquire(50)
+    assert delays == [0.5]
+
+    limiter.throttled()
+    limiter.throttled()
+    assert limiter.rate == 25
+    limiter.succeeded()
+    assert limiter.rate == 35
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.rate == 100
@@ -0,0 +1,72 @@
+from pytest import raises
+from pynamodb.exceptions import PutError, TransactWriteError
+
+from bugdex.core import CanonicalBug, FormerCanonicalBug, UniversalBug, resolve_canonical
+from bugdex.jira_tools import JiraBug
+
+
+def test_crud(sqlite):
+    CanonicalBug(uuid='c1', other_representations={'u1'}).save()
+
+    bug = CanonicalBug.get('c1')
+    assert bug.other_representations == {'u1'}
+    assert CanonicalBug.count() == 1
+
+    bug.update(actions=[CanonicalBug.other_representations.add({'u2', 'u3'})])
+    assert CanonicalBug.get('c1').other_representations == {'u1', 'u2', 'u3'}
+
+    bug.update(actions=[CanonicalBug.other_representations.delete({'u1', 'u2', 'u3'})])
+    assert CanonicalBug.get('c1').other_representations is None
+
+    with raises(PutError):
+        CanonicalBug(uuid='c1').save(condition=CanonicalBug.uuid.does_not_exist())
+
+    bug.delete()
+    with raises(CanonicalBug.DoesNotExist):
+        CanonicalBug.get('c1')
+
+
+def test_query_scan_and_indexes(sqlite):
+    with UniversalBug.batch_write() as batch:
+        for i in range(25):
+            batch.save(UniversalBug(universal_id=f'u{i}', canonical_bug=f'c{i % 5}', source='jira',
+                                    source_specific_id=str(i)))
+
+    assert len(list(UniversalBug.scan(page_size=7))) == 25
+    assert sum(len(list(UniversalBug.scan(segment=segment, total_segments=4))) for segment in range(4)) == 25
+    assert len(list(UniversalBug.scan(UniversalBug.canonical_bug == 'c1'))) == 5
+
+    assert {bug.universal_id for bug in UniversalBug.canonical_bug_index.query('c2', page_size=2)} == {
+        'u2', 'u7', 'u12', 'u17', 'u22'}
+    assert UniversalBug.from_source_specific_index('3', source='jira').universal_id == 'u3'
+    assert UniversalBug.from_source_specific_index('3', source='other') is None
+
+    assert set(UniversalBug.batch_get(['u1', 'u2', 'missing'])) and len(list(UniversalBug.batch_get(['u1', 'u2']))) == 2
+
+
+def test_transactions(sqlite):
+    universal_bug = UniversalBug.propose(universal_id='u1', source='jira', source_specific_id='1')
+    assert UniversalBug.propose(universal_id='u1', source='jira', source_specific_id='1').canonical_bug == \
+        universal_bug.canonical_bug
+
+    target = CanonicalBug.get(universal_bug.canonical_bug)
+    UniversalBug.propose(universal_id='u2', source='jira', source_specific_id='2', canonical_bug='c2')
+    CanonicalBug.merge_many(target, [CanonicalBug.get('c2')])
+
+    assert UniversalBug.get('u2').canonical_bug == target.uuid
+    assert CanonicalBug.get(target.uuid).other_representations == {'u1', 'u2'}
+    assert FormerCanonicalBug.get('c2').replacement == target.uuid
+    assert resolve_canonical('c2').uuid == target.uuid
+
+    with raises(TransactWriteError) as e:
+        with sqlite.transact_write() as transaction:
+            transaction.save(CanonicalBug(uuid='c3'))
+            transaction.save(UniversalBug(universal_id='u1', canonical_bug='c3', source='jira', source_specific_id='1'),
+                             condition=UniversalBug.universal_id.does_not_exist())
+    assert [reason and reason.code for reason in e.value.cancellation_reasons] == [None, 'ConditionalCheckFailed']
+    assert CanonicalBug.get_cached('c3') is None
+
+
+def test_jira_bug(sqlite):
+    JiraBug(id='1', key='SEC-1', project='SEC', summary='summary', issuetype='Bug', labels={'AppSec'}).save()
+    assert JiraBug.get('1').labels == {'AppSec'}
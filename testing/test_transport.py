@@ -0,0 +1,67 @@
+import io
+
+from requests import Request, Response
+from requests.adapters import HTTPAdapter
+
+from bugdex.transport import JiraTransport, endpoint_name, parse_retry_after
+
+
+def _response(status_code: int, headers=None) -> Response:
+    response = Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b'')
+    response.headers.update(headers or {})
+    return response
+
+
+def _request(method='GET', url='https://jira.example.com/rest/api/2/issue/SEC-123/comment', data=None):
+    return Request(method, url, data=data).prepare()
+
+
+def test_endpoint_name():
+    assert endpoint_name(_request()) == 'GET /rest/api/2/issue/{id}/comment'
+    assert endpoint_name(_request('PUT', 'https://jira.example.com/rest/api/2/issue/10001')) == 'PUT /rest/api/2/issue/{id}'
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_retries_rate_limited_requests(monkeypatch):
+    responses = [_response(429, {'Retry-After': '3'}), _response(503), _response(200)]
+    monkeypatch.setattr(HTTPAdapter, 'send', lambda self, request, **kwargs: responses.pop(0))
+
+    delays = []
+    transport = JiraTransport(backoff_base=0.5, sleep=delays.append)
+
+    assert transport.send(_request()).status_code == 200
+    assert delays[0] >= 3
+    assert 0 <= delays[1] <= 1
+
+    stats = transport.stats.snapshot()['GET /rest/api/2/issue/{id}/comment']
+    assert (stats.requests, stats.retries) == (3, 2)
+
+
+def test_gives_up(monkeypatch):
+    monkeypatch.setattr(HTTPAdapter, 'send', lambda self, request, **kwargs: _response(429, {'Retry-After': '3600'}))
+
+    delays = []
+    transport = JiraTransport(max_retries=2, sleep=delays.append)
+    assert transport.send(_request()).status_code == 429
+    assert delays == []
+
+    monkeypatch.setattr(HTTPAdapter, 'send', lambda self, request, **kwargs: _response(429))
+    assert transport.send(_request()).status_code == 429
+    assert len(delays) == 2
+
+
+def test_retries_only_rate_limited_posts(monkeypatch):
+    responses = [_response(429), _response(503), _response(200)]
+    monkeypatch.setattr(HTTPAdapter, 'send', lambda self, request, **kwargs: responses.pop(0))
+
+    transport = JiraTransport(sleep=lambda seconds: None)
+    post = _request('POST', 'https://jira.example.com/rest/api/2/issue', data=b'{}')
+    assert transport.send(post).status_code == 503
+    assert transport.stats.snapshot()['POST /rest/api/2/issue'].retries == 1
@@ -7,6 +7,7 @@ bugdex.environment_tools.set_aws_profile()
 
 for model in [
     bugdex.jira_tools.JiraBug,
+    bugdex.jira_tools.JiraSyncCheckpoint,
     bugdex.CanonicalBug,
     bugdex.UniversalBug,
     bugdex.core.FormerCanonicalBug,
@@ -1,8 +1,41 @@
-from bugdex.jira_tools import connect_to_jira, JiraBug
+import argparse
+
+from bugdex.jira_tools import connect_to_jira, JiraBug, IngestStats
+from bugdex.transport import get_transport
 from bugdex import environment_tools
 
-environment_tools.set_aws_profile()
 
-jira_server = connect_to_jira()
-for bug in JiraBug.ingest(jira_server):
-    print('ingested', bug.key)
+def get_cli_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only ingest issues updated since the last checkpointed sync.')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Ingest issues in batches of this size using batched DynamoDB reads and writes.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of threads to ingest issues (or batches of issues) with. Defaults to no threads.')
+
+    return parser.parse_args()
+
+
+def main(args):
+    environment_tools.set_aws_profile()
+
+    jira_server = connect_to_jira()
+    stats = IngestStats()
+
+    if args.incremental:
+        bugs = JiraBug.ingest_incremental(jira_server, batch_size=args.batch_size, max_workers=args.workers, stats=stats)
+    else:
+        bugs = JiraBug.ingest(jira_server, batch_size=args.batch_size, max_workers=args.workers, stats=stats)
+
+    for bug in bugs:
+        print('ingested', bug.key)
+
+    print(stats)
+    if transport := get_transport(jira_server):
+        print(transport.stats)
+
+
+if __name__ == '__main__':
+    main(get_cli_args())
@@ -0,0 +1,52 @@
+import argparse
+
+from bugdex import environment_tools, snapshot, storage
+
+
+def get_cli_args():
+    parser = argparse.ArgumentParser(description='Export or import snapshots of the bugdex tables.')
+    parser.add_argument('--sqlite', metavar='PATH', default=None,
+                        help='Use this SQLite database instead of DynamoDB, e.g. to seed a local copy.')
+    parser.add_argument('--tables', nargs='+', default=None, help='Only these tables. Defaults to all of them.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Scan the tables into compressed JSON lines files.')
+    export_parser.add_argument('directory')
+    export_parser.add_argument('--segments', type=int, default=4,
+                               help='Number of parallel scan segments per table.')
+    export_parser.add_argument('--chunk-items', type=int, default=100_000, help='Maximum number of items per file.')
+    export_parser.add_argument('--page-size', type=int, default=None, help='Number of items per Scan request.')
+    export_parser.add_argument('--read-capacity', type=float, default=None,
+                               help='Read capacity units per second that the scan of each table may consume.')
+
+    import_parser = subparsers.add_parser('import', help='Write the items of a snapshot to the tables.')
+    import_parser.add_argument('directory')
+    import_parser.add_argument('--items-per-second', type=float, default=100.0,
+                               help='Maximum write rate per table; lowered automatically when throttled.')
+    import_parser.add_argument('--workers', type=int, default=4,
+                               help='Number of files of a table written concurrently.')
+
+    return parser.parse_args()
+
+
+def main(args):
+    if args.sqlite:
+        storage.use_sqlite(args.sqlite)
+    else:
+        environment_tools.set_aws_profile()
+
+    if args.command == 'export':
+        manifest = snapshot.export_snapshot(
+            args.directory, tables=args.tables, total_segments=args.segments, chunk_items=args.chunk_items,
+            page_size=args.page_size, read_capacity_per_second=args.read_capacity)
+        for table_name, table in manifest['tables'].items():
+            print('exported', table['items'], 'items from', table_name)
+    else:
+        imported = snapshot.import_snapshot(args.directory, tables=args.tables,
+                                            items_per_second=args.items_per_second, max_workers=args.workers)
+        for table_name, items in imported.items():
+            print('imported', items, 'items into', table_name)
+
+
+if __name__ == '__main__':
+    main(get_cli_args())
@@ -1,15 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from pathlib import Path
 from sys import stderr
-from typing import Optional, Callable, Iterable
+from typing import Optional, Callable, Iterable, NamedTuple, List, Dict, Any
 
 from more_itertools import one
+import toolz
 
+import csv
+import json
 import os
+import threading
 
 from bugdex.environment_tools import set_aws_profile
-from bugdex.jira_tools import connect_to_jira
+from bugdex.jira_tools import config, connect_to_jira, jira_metadata, fetch_split_issue_candidates
 from bugdex.jira_tools import split_issue
-from jira import JIRAError, Issue, JIRA, Priority
+from jira import JIRAError, Issue, JIRA, Priority, Project
+from jira.resources import IssueType
 
 import argparse
 
@@ -40,16 +47,40 @@ def get_cli_args():
 
     parser = argparse.ArgumentParser()
 
-    parser.add_argument('issue_key', type=str, help='The issue to split. You can also pass an issue ID.')
-    parser.add_argument('project_key', type=str,
+    parser.add_argument('issue_key', type=str, nargs='?', help='The issue to split. You can also pass an issue ID.')
+    parser.add_argument('project_key', type=str, nargs='?',
                         help='Destination project key to split the issue into. For example, "PAY". Input will be upper cased before sending to Jira.')
     parser.add_argument('--issue-type', type=str, default='security bug', help='Issue type for the new bug. Defaults to "security bug"')
     parser.add_argument('--priority-id', type=str, default=None,
                         help='Priority ID for new bug. Defaults to copying the priority from the original bug. Not every priority is supported by each project.'
                              'When in doubt choose 8 for priority "None".')
     parser.add_argument('--undo', help='Undo the split; deletes the split issue if it exists.', action='store_true')
+    parser.add_argument('--refresh-metadata', action='store_true',
+                        help='Refetch cached Jira metadata (projects, priorities, issue link types) before splitting.')
 
-    return parser.parse_args()
+    batch = parser.add_argument_group('batch mode')
+    batch_source = batch.add_mutually_exclusive_group()
+    batch_source.add_argument('--jql', type=str, default=None,
+                              help='Split every issue matching this JQL query into the project given by --project.')
+    batch_source.add_argument('--batch-file', type=Path, default=None,
+                              help='CSV file with rows of: issue key, project key, and optionally issue type and priority ID. '
+                                   'Missing values default to --issue-type and --priority-id.')
+    batch.add_argument('--project', type=str, default=None, help='Destination project key for --jql.')
+    batch.add_argument('--workers', type=int, default=4, help='Number of issues to split concurrently. Defaults to 4.')
+    batch.add_argument('--report', type=Path, default=Path('split-report.jsonl'),
+                       help='File to write one JSON result per issue to. Defaults to "split-report.jsonl".')
+
+    args = parser.parse_args()
+
+    if args.jql or args.batch_file:
+        if args.undo:
+            parser.error('--undo is not supported in batch mode')
+        if args.jql and not args.project:
+            parser.error('--jql requires --project')
+    elif not (args.issue_key and args.project_key):
+        parser.error('issue_key and project_key are required unless --jql or --batch-file is given')
+
+    return args
 
 
 def print_priorities(buf, priorities: Iterable[Priority]):
@@ -66,7 +97,11 @@ def main(args):
     issue = jira_server.issue(args.issue_key)
     # link_types = jira_server.issue_link_types()
 
-    project = jira_server.project(args.project_key.upper())
+    metadata = jira_metadata(jira_server)
+    if args.refresh_metadata:
+        metadata.refresh()
+
+    project = metadata.project(args.project_key.upper())
 
     # Select the issue type by ID
     try:
@@ -77,7 +112,7 @@ def main(args):
         return exit(1)  # return is to tell linters that branch terminates
 
     # Set priority. Default to the original issue's priority, otherwise select the priority by ID.
-    priorities = jira_server.priorities()
+    priorities = metadata.priorities()
     try:
         if args.priority_id is None:
             priority = issue.fields.priority
@@ -106,5 +141,120 @@ def main(args):
                     print('deleted issue')
 
 
+class SplitRequest(NamedTuple):
+    issue_key: str
+    project_key: str
+    issue_type: str
+    priority_id: Optional[str]
+
+
+def read_batch_file(path: Path, default_issue_type: str, default_priority_id: Optional[str]) -> List[SplitRequest]:
+    requests = []
+    with path.open(newline='') as f:
+        for row in csv.reader(f):
+            row = [value.strip() for value in row]
+            if not row or not row[0] or row[0].startswith('#'):
+                continue
+            issue_key, project_key, issue_type, priority_id = (row + [''] * 4)[:4]
+            requests.append(SplitRequest(issue_key, project_key, issue_type or default_issue_type, priority_id or default_priority_id))
+    return requests
+
+
+def fetch_issues(jira_server: JIRA, issue_keys: Iterable[str]) -> Dict[str, Issue]:
+    """Fetch issues with one search per 100 keys, by key and by ID
+
+    Keys of issues that do not exist, or that the user cannot see, are missing from the result; without
+    `validate_query=False`, Jira would reject the whole search.
+    """
+    issues = {}
+    for chunk in toolz.partition_all(100, sorted(set(issue_keys))):
+        for issue in jira_server.search_issues(
+                'key in ({})'.format(', '.join(chunk)), maxResults=False, validate_query=False):
+            issues[issue.key] = issues[issue.id] = issue
+    return issues
+
+
+def main_batch(args):
+    set_aws_profile()
+
+    print('connecting to jira')
+    jira_server = connect_to_jira()
+
+    metadata = jira_metadata(jira_server)
+    projects: Dict[str, Project] = {}
+    projects_lock = threading.Lock()
+
+    def get_project(key: str) -> Project:
+        with projects_lock:
+            if key not in projects:
+                projects[key] = metadata.project(key)
+            return projects[key]
+
+    def split_one(request: SplitRequest) -> Dict[str, Any]:
+        result: Dict[str, Any] = request._asdict()
+        try:
+            if not (issue := issues.get(request.issue_key)):
+                raise ValueError(f'issue {request.issue_key} not found')
+            project = get_project(request.project_key.upper())
+            try:
+                issue_type: IssueType = one(filter(lambda x: x.name.lower() == request.issue_type.lower(), project.issueTypes))
+            except ValueError:
+                raise ValueError(f'project {project.key} has no issue type with name "{request.issue_type.lower()}" (case insensitive)')
+            if request.priority_id is None:
+                priority = issue.fields.priority
+            elif not (priority := priorities.get(request.priority_id)):
+                raise ValueError(f'invalid priority ID {request.priority_id}')
+
+            _split_issue = split_issue(
+                jira_server, issue, project, issue_type, priority, issue_split=issue_split, linked_issues=linked_issues)
+        except (JIRAError, ValueError) as e:
+            result.update(status='error', error=str(e))
+        except Exception as e:
+            # e.g. connection errors, or issues without a priority; one issue must not stop the batch
+            result.update(status='error', error=f'{type(e).__name__}: {e}')
+        else:
+            result.update(status='split', split_issue=_split_issue.key)
+        return result
+
+    results = []
+    try:
+        if args.jql:
+            issues = {issue.key: issue for issue in jira_server.search_issues(
+                args.jql, maxResults=False, validate_query=False)}
+            requests = [SplitRequest(key, args.project, args.issue_type, args.priority_id) for key in issues]
+        else:
+            requests = read_batch_file(args.batch_file, args.issue_type, args.priority_id)
+            issues = fetch_issues(jira_server, (request.issue_key for request in requests))
+
+        # metadata shared by all splits is resolved once
+        if args.refresh_metadata:
+            metadata.refresh()
+        priorities = {priority.id: priority for priority in metadata.priorities()}
+        issue_split = metadata.issue_link_type(config['issue_split_id'])
+        linked_issues = fetch_split_issue_candidates(jira_server, issues.values())
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for result in executor.map(split_one, requests):
+                results.append(result)
+    finally:
+        # also report the splits that were done if the run is interrupted
+        with args.report.open('w') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+
+    failed = [result for result in results if result['status'] == 'error']
+    print(f'split {len(results) - len(failed)} of {len(results)} issues; report written to {args.report}')
+    for result in failed:
+        stderr.write(f'{result["issue_key"]}: {result["error"]}\n')
+    stderr.flush()
+
+    if failed:
+        return exit(1)
+
+
 if __name__ == '__main__':
-    main(get_cli_args())
+    cli_args = get_cli_args()
+    if cli_args.jql or cli_args.batch_file:
+        main_batch(cli_args)
+    else:
+        main(cli_args)